@@ -8,13 +8,36 @@ Created on Tue Dec  6 22:01:27 2016
 # Tape image convert script
 
 import argparse
+from array import array
+import re
+import struct
 import sys
 
 class PerLine:
+    SYNC_PATTERN = "00000000000000000000000001111110000000000000000000000000101111010000000000000000000000001101101100000000000000000000000011100111"
+    # Byte translation table that reads anything that is not a '1' as a '0'
+    NOT_ONE = bytes.maketrans(bytes(range(256)), b'0'*0x31 + b'1' + b'0'*(256-0x32))
+    LEADING_ZEROS = re.compile('0*')
+    SYNC_LEADING_ZEROS = SYNC_PATTERN.index('1')
+    ROW_LEN = 37
+    CHUNK_LEN = 15*ROW_LEN
+    MAX_DECODED_CHUNKS = 4096
+    # Codes are 15 bits, so the top bit of an ECC table entry marks it as usable
+    ECC_VALID = 0x8000
+    # The attributes are fixed, so they are kept in slots rather than a per-instance dict
+    __slots__ = ('args', 'fpout', 'ecc', 'decoded_chunks', 'row_shifts', 'chunk_header_mask', 'chunk_header_bits', 'record')
+
     def __init__(self, args):
         self.args = args
         self.fpout = 0
         self.CreateECCTable()
+        # Leaders and repeated records produce the same chunks over and over,
+        # so decoded chunks are cached by their rows
+        self.decoded_chunks = {}
+        # Shifts that pick each row out of a chunk parsed as one integer
+        self.row_shifts = [self.ROW_LEN*(14-r) for r in range(0,15)]
+        self.chunk_header_mask = sum(0x1f00000000 << shift for shift in self.row_shifts)
+        self.chunk_header_bits = sum(0x1d00000000 << shift for shift in self.row_shifts)
         self.record = 1
 
     def CreateECCTable(self):
@@ -40,118 +63,84 @@ class PerLine:
                 0x02,0x01,0x01,0x02,0x01,0x02,0x02,0x02]
         """
                 
-        # map from bad code, to tuple (status, fixed_code)
-        self.ecc = {}
-        # first, add correct codes
-        for i in range(0,1024):
-            code = i | (high_syndrome[(i>>5)&0x1f] ^ low_syndrome[i&0x1f]) << 10
-            self.ecc[code] = (1,code)
-        # now add single-bit errors
-        correct_keys = list(self.ecc.keys())
-        for k in correct_keys:
-            for bad_bit in range(0,15):
-                bad_code = k ^ (1<<bad_bit)
-                self.ecc[bad_code] = (2,k)
-        for i in range(0,32768):
-            if self.ecc.get(i) == None:
-                self.ecc[i] = (0,0)
+        # map from code to ECC_VALID|fixed_code, or 0 if the code can't be fixed
+        self.ecc = array('H', bytes(2*32768))
+        correct_codes = [i | (high_syndrome[i>>5] ^ low_syndrome[i&0x1f]) << 10 for i in range(0,1024)]
+        # first, add single-bit errors, one bit position at a time
+        for bad_bit in range(0,15):
+            bad_mask = 1<<bad_bit
+            for k in correct_codes:
+                self.ecc[k ^ bad_mask] = self.ECC_VALID | k
+        # then the correct codes themselves
+        for k in correct_codes:
+            self.ecc[k] = self.ECC_VALID | k
                 
     def DecodeChunk(self, row_array):
-        column_array = [0] * 32
-        i = 0        
-        for row in row_array:
-            for j in range(0,32):
-                column_array[j] = column_array[j]*2 + ((row >> (31-j))&1)
-            i = i + 1
+        key = tuple(row_array)
+        column_array = self.decoded_chunks.get(key)
+        if column_array != None:
+            return column_array
+        # Transpose the 15x32 bit matrix by zipping the rows as binary strings
+        rows = [format(row,'032b') for row in row_array]
+        column_array = [int(''.join(column),2) for column in zip(*rows)]
         for i in range(0,32):
             #print(column_array[i])
-            t = self.ecc[column_array[i]]
-            #print(column_array[i],t)
-            if t[0] == 2:
-                #print("Fixed Bit",column_array[i],'->',t[1])
-                column_array[i] = t[1]
-            if t[0] == 0:
+            fixed = self.ecc[column_array[i]]
+            #print(column_array[i],fixed)
+            if fixed == 0:
                 print("Error!!")
                 sys.exit()
+            #if fixed != self.ECC_VALID | column_array[i]:
+            #    print("Fixed Bit",column_array[i],'->',fixed & 0x7fff)
+            column_array[i] = fixed & 0x7fff
+        if len(self.decoded_chunks) >= self.MAX_DECODED_CHUNKS:
+            self.decoded_chunks.clear()
+        self.decoded_chunks[key] = column_array
         return column_array
         
+    def CheckRows(self, bits, row_start, start, end):
+        "Exits at the first complete row between start and end without an 11101 header"
+        for pos in range(start, end - self.ROW_LEN + 1, self.ROW_LEN):
+            if bits[pos:pos+5] != b'11101':
+                print("\nError!",row_start+pos+self.ROW_LEN-1)
+                sys.exit()
+
     def Process(self,line):
         #print(len(line))
-        c_count = 0
-        state = 0
-        zero_count = 0
-        counting_zeros = True
-        sync_pattern = ''
-        char_count = 0
-        row_count = 0
-        chunk_count = 0
-        for c in line:
-            if state == 0:
-                if c == '0':
-                    if counting_zeros:
-                        zero_count = zero_count + 1
-                        #print('0',end='')
-                else:
-                    counting_zeros = False
-                sync_pattern = sync_pattern + c
-                if len(sync_pattern) > 32*4:
-                    sync_pattern = sync_pattern[1:]
-                if sync_pattern == "00000000000000000000000001111110000000000000000000000000101111010000000000000000000000001101101100000000000000000000000011100111":
-                    #print("\nZero Count =",zero_count-25)
-                    #print(sync_pattern[25:],end='')
-                    self.args.outfile.write('zero '+str(zero_count-25)+'\n')                    
-                    state = 1
-                    row = 0
-                    char_count = 0
-                    row_count = 0
-                    chunk_count = 0
-                    row_array = []
-            elif state == 1:
-                row = row * 2
-                if c == '1':
-                    row = row + 1
-                char_count = char_count + 1
-                if char_count == 37:
-                    if (row & 0x1f00000000) == 0x1d00000000:
-                        row_array.append(row & 0xffffffff)
-                    else:
-                        print("\nError!",c_count)
-                        sys.exit()
-                    row = 0
-                    char_count = 0
-                    row_count = row_count + 1
-                if row_count == 15:
-                    column_array = self.DecodeChunk(row_array)
-                    """
-                    for i in range(0,15):
-                        print('11101',end='')
-                        for j in range(0,32):
-                            if (column_array[j] >> (14-i)) & 0x01:
-                                print('1',end='')
-                            else:
-                                print('0',end='')
-                    """
-                    if self.fpout == 0:
-                        #self.fpout = open('record'+str(column_array[0]&0x3ff)+'.bin','wb')
-                        self.fpout = open('record_'+str(self.record).rjust(4, '0')+'.bin','wb')
-                        self.args.outfile.write('file record_'+str(self.record).rjust(4, '0')+'.bin\n')
-                        self.record = self.record + 1
-                    for j in range(0,32):
-                        val = column_array[j]&0x3ff
-                        self.fpout.write(bytearray([val>>8,val&0xff]))
-                    row_array = []
-                    chunk_count = chunk_count + 1
-                    #print(ca[0]&0x3ff,end=' ')
-                    row_count = 0
-            #print('c_count:',c_count)
-            c_count = c_count + 1
-        if state==0 and zero_count > 0:
-            self.args.outfile.write('zero '+str(zero_count)+'\n')
+        # Leading zeros are counted up to the first non-zero character, without copying the line
+        zero_count = self.LEADING_ZEROS.match(line).end()
+        # The sync pattern's first '1' can't come before the line's first '1', so the search skips the leader
+        sync_index = line.find(self.SYNC_PATTERN, max(0, zero_count - self.SYNC_LEADING_ZEROS))
+        if sync_index < 0:
+            if zero_count > 0:
+                self.args.outfile.write('zero '+str(zero_count)+'\n')
+        else:
+            #print("\nZero Count =",zero_count-25)
+            self.args.outfile.write('zero '+str(zero_count-25)+'\n')
+            row_start = sync_index + len(self.SYNC_PATTERN)
+            # Anything that is not a '1' (including error markers) is read as a 0 bit.  The bits are
+            # handled as bytes, one per character, which translate at C speed.
+            bits = line[row_start:].encode('ascii', 'replace').translate(self.NOT_ONE)
+            chunk_end = len(bits) - len(bits) % self.CHUNK_LEN
+            for pos in range(0, chunk_end, self.CHUNK_LEN):
+                # Parse all 15 rows at once, and check their headers with one mask
+                chunk = int(bits[pos:pos+self.CHUNK_LEN], 2)
+                if (chunk & self.chunk_header_mask) != self.chunk_header_bits:
+                    self.CheckRows(bits, row_start, pos, pos+self.CHUNK_LEN)
+                row_array = [(chunk >> shift) & 0xffffffff for shift in self.row_shifts]
+                column_array = self.DecodeChunk(row_array)
+                if self.fpout == 0:
+                    #self.fpout = open('record'+str(column_array[0]&0x3ff)+'.bin','wb')
+                    self.fpout = open('record_'+str(self.record).rjust(4, '0')+'.bin','wb')
+                    self.args.outfile.write('file record_'+str(self.record).rjust(4, '0')+'.bin\n')
+                    self.record = self.record + 1
+                self.fpout.write(struct.pack('>32H',*[val&0x3ff for val in column_array]))
+            # Rows after the last whole chunk are not converted, but must still be valid
+            self.CheckRows(bits, row_start, chunk_end, len(bits))
         #print()
         if self.fpout != 0:
             self.fpout.close()
             self.fpout = 0
-        #print('chunk_count=',chunk_count,'  row_count=',row_count,'  char_count=',char_count)
                     
                 
                     
@@ -11,6 +11,7 @@ import argparse
 import wave
 import sys
 import math
+from array import array
 
 class PerBit:
     def __init__(self,args):
@@ -132,10 +133,10 @@ class PerSample:
             threshold = 0.0
             prev_sample = self.sample_buffer[self.energy_window-2]
             # did we get a transition?
-            if math.copysign(1,prev_sample-threshold) != math.copysign(1,sample-threshold):
+            if (prev_sample < threshold) != (sample < threshold):
                 # calculate interpolated sample
-                span = math.fabs(sample-prev_sample)
-                frac = math.fabs(prev_sample-threshold)
+                span = abs(sample-prev_sample)
+                frac = abs(prev_sample-threshold)
                 ifrac = (i-1) + frac/span
                 ##print(threshold)
                 #print(prev_sample,sample,threshold,i-1,i,ifrac)
@@ -146,21 +147,24 @@ class PerSample:
                 #last_ifrac = ifrac
     
 class KCFile:
+    GROUPS_PER_BLOCK = 4096
+    # Input sample index within a group, for each of the 16 output samples it produces
+    FRAME_LAYOUT = (0,1,2,5, 0,3,4,5, 0,6,7,5, 0,8,9,5)
+
     def __init__(self):
         parser = argparse.ArgumentParser(description='Decode KC dat file to wav.')
         parser.add_argument('infile', type=argparse.FileType('rb'), help='Input file to decode')
         parser.add_argument('outfile', type=argparse.FileType('wb'), help='Output file')
         self.args = parser.parse_args()
 
-    def GetSample(self, rawdata, index):
-         s = int.from_bytes(rawdata[index*2:index*2+2], byteorder='little', signed=False)
-         return (s-2048)*16
+    def GetSamples(self, rawblock):
+        # Decode whole 20-byte groups of little-endian 12-bit samples at once
+        samples = array('H')
+        samples.frombytes(rawblock[:len(rawblock)-len(rawblock)%20])
+        if sys.byteorder == 'big':
+            samples.byteswap()
+        return array('h', [(s-2048)*16 for s in samples])
     
-    def BuildFrame(self, frame, newvals):
-        for newval in newvals:
-            frame = frame + newval.to_bytes(2, byteorder='little', signed=True)
-        return frame
-        
     def Process(self):
         ww = wave.Wave_write(self.args.outfile)
     
@@ -168,39 +172,21 @@ class KCFile:
         ww.setframerate(40000)
         ww.setsampwidth(2)
     
-        last2 = 0
-        last3 = 0
-        rawdata = self.args.infile.read(20)
-        while len(rawdata) == 20:
-            channel1  = self.GetSample(rawdata,0)
-            channel2a = self.GetSample(rawdata,1)            
-            channel3a = self.GetSample(rawdata,2)            
-            channel2b = self.GetSample(rawdata,3)            
-            channel3b = self.GetSample(rawdata,4)            
-            channel4  = self.GetSample(rawdata,5)
-            channel2c = self.GetSample(rawdata,6)            
-            channel3c = self.GetSample(rawdata,7)            
-            channel2d = self.GetSample(rawdata,8)            
-            channel3d = self.GetSample(rawdata,9)            
-            
-            """
-            channel2a = (5*channel2a+last2)/6
-            channel2c = (5*channel2c+channel2b)/6
-            last2 = channel2d
-
-            channel3a = (5*channel3a+last3)/6
-            channel3c = (5*channel3c+channel3b)/6
-            last3 = channel3d
-            """
-            
-            frame = bytearray([])
-            frame = self.BuildFrame(frame,[channel1,channel2a,channel3a,channel4])
-            frame = self.BuildFrame(frame,[channel1,channel2b,channel3b,channel4])
-            frame = self.BuildFrame(frame,[channel1,channel2c,channel3c,channel4])
-            frame = self.BuildFrame(frame,[channel1,channel2d,channel3d,channel4])
+        # Read and write many 20-byte groups at a time, rather than one per call
+        rawblock = self.args.infile.read(20*self.GROUPS_PER_BLOCK)
+        while len(rawblock) >= 20:
+            samples = self.GetSamples(rawblock)
+            # Each 10-sample group becomes 4 frames of 4 channels.  Channels 1 and 4
+            # are repeated in every frame, channels 2 and 3 take one sample each.
+            frame = array('h', bytes(len(samples)*16//10*2))
+            for out_index, in_index in enumerate(self.FRAME_LAYOUT):
+                frame[out_index::16] = samples[in_index::10]
+            # wave takes native 16-bit samples, and stores them little-endian itself
             ww.writeframes(frame)
             
-            rawdata = self.args.infile.read(20)
+            if len(rawblock) < 20*self.GROUPS_PER_BLOCK:
+                break
+            rawblock = self.args.infile.read(20*self.GROUPS_PER_BLOCK)
                
         #self.persample = PerSample(self.args, self.framerate)
         
@@ -11,14 +11,23 @@ import argparse
 import wave
 import sys
 import math
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import deque
 
 class PerBit:
     def __init__(self,args):
         self.args = args
         self.state = 'wzeros'
+        # Bits are collected here and written out a whole data segment at a time
+        self.bits = []
         
     def ProcessBit(self,ifrac,bit):                 
-        self.args.outfile.write(bit)
+        self.bits.append(bit)
+
+    def Flush(self):
+        self.args.outfile.write(''.join(self.bits))
+        self.bits = []
 
 class PerTransition:
     
@@ -31,6 +40,9 @@ class PerTransition:
         self.energy_threshold = 500.0
         self.framerate = framerate
         self.perbit = PerBit(args)
+        # Bound once, as these are called for every bit
+        self.measure = args.measure
+        self.ProcessBit = self.perbit.ProcessBit
         # State Variables
         self.last_ifrac = None
         self.expecting_short = False
@@ -38,10 +50,21 @@ class PerTransition:
         self.SetTimeThresholds()
         self.num_deltas = 0
         self.total_deltas = 0.0
+        # Totals over the whole file, to suggest a bitrate to decode with
+        self.file_num_deltas = 0
+        self.file_total_deltas = 0.0
         
     def AddDelta(self,delta):
         self.num_deltas = self.num_deltas + 1
         self.total_deltas = self.total_deltas + delta
+        self.file_num_deltas = self.file_num_deltas + 1
+        self.file_total_deltas = self.file_total_deltas + delta
+
+    def PrintMeasuredBitrate(self):
+        "Called at the end of measure mode"
+        if self.file_num_deltas != 0:
+            # A '0' bit is a single long interval, so its length is the bit period
+            print('Measured bitrate =',self.framerate*self.file_num_deltas/self.file_total_deltas)
         
 
     def SetTimeThresholds(self):
@@ -49,66 +72,77 @@ class PerTransition:
         self.short_top =    (2.0+self.absolute_percent_threshold/100.0)*self.nominal_samples_per_bit/4.0
         self.long_bottom =  (4.0-self.absolute_percent_threshold/100.0)*self.nominal_samples_per_bit/4.0
         self.long_top     = (4.0+self.absolute_percent_threshold/100.0)*self.nominal_samples_per_bit/4.0
+        # Interval classes in order of increasing delta.  Bottom thresholds are
+        # inclusive and top thresholds exclusive, so they are searched separately.
+        self.interval_labels = 'sSmLw'
+        self.interval_bottoms = (self.short_bottom, self.long_bottom)
+        self.interval_tops = (self.short_top, self.long_top)
         
-    def Process(self,energy,ifrac):
-        "Called for every Transition or every low energy sample"
-        ##print(energy,ifrac)
-        if energy >= self.energy_threshold:
-            # Got Valid Energy Level Threshold
-            if self.last_ifrac == None:
-                # First Transition
-                if self.args.measure:
-                    if self.num_deltas != 0:
-                        print(self.total_deltas/self.num_deltas)
-                    self.num_deltas = 0
-                    self.total_deltas = 0.0
-                self.last_ifrac = ifrac
-                #print()
-                self.args.outfile.write('time '+str(ifrac/self.framerate)+'\n')
-                self.args.outfile.write('data ')
-            else:
-                # At least 2 transitions with valid energy
-                delta = ifrac - self.last_ifrac
-                self.last_ifrac = ifrac
-                
-                #print(delta, ifrac)
-                if delta > self.long_top:
-                    interval = 'w'
-                elif delta >= self.long_bottom:
-                    interval = 'L'
-                elif delta > self.short_top:
-                    interval = 'm'
-                elif delta >= self.short_bottom:
-                    interval = 'S'
+    def ProcessBlock(self,transitions):
+        "Called with the (energy,ifrac) of every Transition in a block of samples"
+        # The state machine runs in locals, and is saved again after the block
+        energy_threshold = self.energy_threshold
+        framerate = self.framerate
+        measure = self.measure
+        write = self.args.outfile.write
+        ProcessBit = self.ProcessBit
+        interval_labels = self.interval_labels
+        interval_bottoms = self.interval_bottoms
+        interval_tops = self.interval_tops
+        last_ifrac = self.last_ifrac
+        expecting_short = self.expecting_short
+        for energy,ifrac in transitions:
+            ##print(energy,ifrac)
+            if energy >= energy_threshold:
+                # Got Valid Energy Level Threshold
+                if last_ifrac == None:
+                    # First Transition
+                    if measure:
+                        if self.num_deltas != 0:
+                            print(self.total_deltas/self.num_deltas)
+                        self.num_deltas = 0
+                        self.total_deltas = 0.0
+                    last_ifrac = ifrac
+                    #print()
+                    write('time '+str(ifrac/framerate)+'\n')
+                    write('data ')
                 else:
-                    interval = 's'
+                    # At least 2 transitions with valid energy
+                    delta = ifrac - last_ifrac
+                    last_ifrac = ifrac
                     
-                if self.expecting_short:
-                    if not self.args.measure:
-                        if interval == 'S':
-                            self.perbit.ProcessBit(ifrac,'1')
-                        else:
-                            self.perbit.ProcessBit(ifrac,interval)
-                    self.expecting_short = False
-                else:
-                    if interval == 'L':
-                        if self.args.measure:
-                            self.AddDelta(delta)
-                        else:
-                            self.perbit.ProcessBit(ifrac,'0')
-                        #self.nominal_samples_per_bit = delta
-                        #self.SetTimeThresholds()
-                    elif interval == 'S':
-                        self.expecting_short = True
+                    #print(delta, ifrac)
+                    interval = interval_labels[bisect_right(interval_bottoms,delta) + bisect_left(interval_tops,delta)]
+                        
+                    if expecting_short:
+                        if not measure:
+                            if interval == 'S':
+                                ProcessBit(ifrac,'1')
+                            else:
+                                ProcessBit(ifrac,interval)
+                        expecting_short = False
                     else:
-                        if not self.args.measure:
-                            self.perbit.ProcessBit(ifrac,interval)
-        else:
-            if self.last_ifrac != None:
-                self.perbit.ProcessBit(ifrac,'e')
-                self.args.outfile.write('\ntime '+str(ifrac/self.framerate)+'\n')
-            self.last_ifrac = None
-            self.expecting_short = False
+                        if interval == 'L':
+                            if measure:
+                                self.AddDelta(delta)
+                            else:
+                                ProcessBit(ifrac,'0')
+                            #self.nominal_samples_per_bit = delta
+                            #self.SetTimeThresholds()
+                        elif interval == 'S':
+                            expecting_short = True
+                        else:
+                            if not measure:
+                                ProcessBit(ifrac,interval)
+            else:
+                if last_ifrac != None:
+                    ProcessBit(ifrac,'e')
+                    self.perbit.Flush()
+                    write('\ntime '+str(ifrac/framerate)+'\n')
+                last_ifrac = None
+                expecting_short = False
+        self.last_ifrac = last_ifrac
+        self.expecting_short = expecting_short
     
 class PerSample:
     def __init__(self, args, framerate):
@@ -116,26 +150,52 @@ class PerSample:
         self.samples_per_bit = framerate / args.bitrate
         # NRZI should go to max/min over 2 bit periods, picked 10 to smooth things
         self.energy_window = math.ceil(self.samples_per_bit*10)
-        self.sample_buffer = []
+        # Monotonic (index,sample) queues giving the running max/min over the energy window
+        self.sample_count = 0
+        self.prev_sample = 0.0
+        self.window_max = deque()
+        self.window_min = deque()
         #self.last_ifrac = 0.0
         self.pertransition = PerTransition(args,self.samples_per_bit,self.framerate)
-        self.dcwindow_samples = []
+        self.ProcessTransitions = self.pertransition.ProcessBlock
+        # A transition below the energy threshold only matters to PerTransition right after
+        # one above it, so runs of them (noise between recordings) are not passed on
+        self.energy_threshold = self.pertransition.energy_threshold
+        self.last_energy_valid = False
+        self.dcwindow_samples = array('d')
+        self.dcwindow_len = 0
         self.dcwindow_mid_index = -1
         self.dcwindow_i_shift = 0
+        self.dcwindow_sum = 0.0
+        self.dcwindow_pos = 0
         self.dcwindow_is_active = False
-        if self.samples_per_bit * args.dcwindow > 1.0:
+        self.dcblock_is_active = False
+        self.dcblock_pole = 0.0
+        self.dcblock_prev_x = 0.0
+        self.dcblock_prev_y = 0.0
+        if args.dcpole > 0.0 and args.dcpole < 1.0:
+            # Use a single-pole IIR DC blocker, y[n] = x[n] - x[n-1] + pole*y[n-1], in
+            # place of the DC offset window.  It only needs the previous input and
+            # output, and doesn't delay the samples.
+            self.dcblock_is_active = True
+            self.dcblock_pole = args.dcpole
+            print( "DC blocking filter pole = ", args.dcpole )
+        elif self.samples_per_bit * args.dcwindow > 1.0:
             # Only use DC offset windowing if dcwindow_len is >= 2
             #
             # When activated, the values in dcwindow_samples will be averaged which will 
             # then be used to offset the middle sample.  This is used to remove DC bias
             # and low-frequency noise from the data.  Note that the dcwindow_samples is
-            # is initialized to a fixed length and filled with zeros.
+            # is initialized to a fixed length and filled with zeros.  It is used as a
+            # ring buffer, with dcwindow_pos the next slot to overwrite, and the sum of
+            # the window is kept up to date as samples go in and out (or re-added when
+            # the high frequency filter makes the samples fractional).
             self.dcwindow_is_active = True
             dcwindow_len = math.ceil( self.samples_per_bit * args.dcwindow )
+            self.dcwindow_len = dcwindow_len
             self.dcwindow_mid_index = math.floor( dcwindow_len/2 )
             self.dcwindow_i_shift = dcwindow_len - self.dcwindow_mid_index - 1
-            for i in range( 0, dcwindow_len):
-                self.dcwindow_samples.append(0.0)
+            self.dcwindow_samples = array('d', bytes(8*dcwindow_len))
             print( "DC offset window size = ", dcwindow_len )
             #print( "dcwindow_mid_index = ", self.dcwindow_mid_index )
             #print( "dcwindow_i_shift   = ", self.dcwindow_i_shift )
@@ -144,64 +204,141 @@ class PerSample:
         if args.highfilter > 0.0 and args.highfilter < 1.0:
             self.hfmax = args.highfilter
         self.hfmax = self.hfmax * 65536
+        # 16-bit samples never step by 65536 or more, so the full-range filter is a no-op
+        self.hf_is_active = self.hfmax < 65536
 
-    def Process(self,i,sample):
-        "Called for Every Sample to be processed"
-        # Apply simple high frequency filter
-        sample_org = sample
-        sample_delta = sample - self.hf_prev_sample
-        if abs( sample_delta ) > self.hfmax:
-            if sample_delta > 0:
-                sample = self.hf_prev_sample + self.hfmax
-            else:
-                sample = self.hf_prev_sample - self.hfmax
-        self.hf_prev_sample = sample
-        #print( sample_org/32768.0, "," ,sample/32768.0 )
+    def Flush(self):
+        "Called after the last sample, to write out any pending bits"
+        self.pertransition.perbit.Flush()
 
-        if self.dcwindow_is_active:
-            # Apply the DC offset window algorithm:
-            # Shift the samples in the DC offset list, compute the DC offset and subtract it
-            # from the middle sample, adjust i to represent the middle sample.
-            self.dcwindow_samples.append(sample)
-            self.dcwindow_samples.pop(0)
-            sample = self.dcwindow_samples[ self.dcwindow_mid_index ] - sum( self.dcwindow_samples )/len( self.dcwindow_samples )
-            i = i - self.dcwindow_i_shift
-            # Uncomment below for CSV output with 2 columns: samples_original, samples_dc_offset_removed
-            #print( self.dcwindow_samples[ self.dcwindow_mid_index ]/32768.0, "," ,sample/32768.0 )
-        self.sample_buffer.append(sample)
-        if len(self.sample_buffer) > self.energy_window:
-            self.sample_buffer.pop(0)
-        if ( len(self.sample_buffer) == self.energy_window ) and ( i + self.dcwindow_i_shift > len(self.dcwindow_samples) ) :
-            # define energy as max-min over the window
-            energy = max(self.sample_buffer) - min(self.sample_buffer)
-            # define decision threshold as (max+min)/2 over the window
-            #threshold = (max(self.sample_buffer) + min(self.sample_buffer)) / 2.0
-            threshold = 0.0
-            prev_sample = self.sample_buffer[self.energy_window-2]
-            # did we get a transition?
-            if math.copysign(1,prev_sample-threshold) != math.copysign(1,sample-threshold):
-                # calculate interpolated sample
-                span = math.fabs(sample-prev_sample)
-                frac = math.fabs(prev_sample-threshold)
-                ifrac = (i-1) + frac/span
-                ##print(threshold)
-                #print(prev_sample,sample,threshold,i-1,i,ifrac)
-                #print(ifrac - last_ifrac)
-                ##print(energy,ifrac)
-                self.pertransition.Process(energy,ifrac)
-                ###process_transition(energy,ifrac)
-                #last_ifrac = ifrac
+    def ProcessBlock(self,i,samples):
+        "Called for Every Block of Samples to be processed, i is the index of the first sample"
+        # The per-sample state is kept in locals while the block is processed
+        hf_is_active = self.hf_is_active
+        hfmax = self.hfmax
+        hf_prev_sample = self.hf_prev_sample
+        dcwindow_is_active = self.dcwindow_is_active
+        dcwindow_samples = self.dcwindow_samples
+        dcwindow_len = self.dcwindow_len
+        dcwindow_i_shift = self.dcwindow_i_shift
+        dcwindow_sum = self.dcwindow_sum
+        dcwindow_pos = self.dcwindow_pos
+        dcblock_is_active = self.dcblock_is_active
+        dcblock_pole = self.dcblock_pole
+        dcblock_prev_x = self.dcblock_prev_x
+        dcblock_prev_y = self.dcblock_prev_y
+        energy_window = self.energy_window
+        window_max = self.window_max
+        window_min = self.window_min
+        # Bound methods of the queues, so they aren't looked up for every sample
+        window_max_pop = window_max.pop
+        window_max_append = window_max.append
+        window_max_popleft = window_max.popleft
+        window_min_pop = window_min.pop
+        window_min_append = window_min.append
+        window_min_popleft = window_min.popleft
+        n = self.sample_count
+        prev_sample = self.prev_sample
+        energy_threshold = self.energy_threshold
+        last_energy_valid = self.last_energy_valid
+        transitions = []
+        # define decision threshold as (max+min)/2 over the window
+        #threshold = (max(self.sample_buffer) + min(self.sample_buffer)) / 2.0
+        threshold = 0.0
+        for sample in samples:
+            if hf_is_active:
+                # Apply simple high frequency filter
+                sample_org = sample
+                sample_delta = sample - hf_prev_sample
+                if sample_delta > hfmax:
+                    sample = hf_prev_sample + hfmax
+                elif sample_delta < -hfmax:
+                    sample = hf_prev_sample - hfmax
+                hf_prev_sample = sample
+                #print( sample_org/32768.0, "," ,sample/32768.0 )
+
+            ifirst = i - 1
+            if dcwindow_is_active:
+                # Apply the DC offset window algorithm:
+                # Shift the samples in the DC offset list, compute the DC offset and subtract it
+                # from the middle sample, adjust i to represent the middle sample.
+                dcwindow_sum = dcwindow_sum + sample - dcwindow_samples[dcwindow_pos]
+                dcwindow_samples[dcwindow_pos] = sample
+                mid_sample = dcwindow_samples[ dcwindow_pos - dcwindow_i_shift ]
+                dcwindow_pos = dcwindow_pos + 1
+                if dcwindow_pos == dcwindow_len:
+                    dcwindow_pos = 0
+                if hf_is_active:
+                    # Filtered samples aren't whole numbers, so the running sum would drift by rounding.
+                    # Re-add the window from its oldest sample instead, to keep the exact same average.
+                    dcwindow_sum = sum( dcwindow_samples[dcwindow_pos:] + dcwindow_samples[:dcwindow_pos] )
+                sample = mid_sample - dcwindow_sum/dcwindow_len
+                ifirst = ifirst - dcwindow_i_shift
+                # Uncomment below for CSV output with 2 columns: samples_original, samples_dc_offset_removed
+                #print( mid_sample/32768.0, "," ,sample/32768.0 )
+            elif dcblock_is_active:
+                # Apply the IIR DC blocking filter
+                dcblock_prev_y = sample - dcblock_prev_x + dcblock_pole*dcblock_prev_y
+                dcblock_prev_x = sample
+                sample = dcblock_prev_y
+            # Monotonic (index,sample) queues give the running max/min over the energy window
+            while window_max and window_max[-1][1] <= sample:
+                window_max_pop()
+            window_max_append((n,sample))
+            if window_max[0][0] <= n - energy_window:
+                window_max_popleft()
+            while window_min and window_min[-1][1] >= sample:
+                window_min_pop()
+            window_min_append((n,sample))
+            if window_min[0][0] <= n - energy_window:
+                window_min_popleft()
+            n = n + 1
+            # Wait for a full energy window, and for the DC offset window to fill
+            if ( n >= energy_window ) and ( i > dcwindow_len ) :
+                # did we get a transition?
+                if (prev_sample < threshold) != (sample < threshold):
+                    # define energy as max-min over the window
+                    energy = window_max[0][1] - window_min[0][1]
+                    energy_valid = energy >= energy_threshold
+                    if energy_valid or last_energy_valid:
+                        # calculate interpolated sample.  The samples are on opposite sides
+                        # of the threshold, so this ratio is already positive.
+                        ifrac = ifirst + (prev_sample-threshold)/(prev_sample-sample)
+                        ##print(threshold)
+                        #print(prev_sample,sample,threshold,i-1,i,ifrac)
+                        #print(ifrac - last_ifrac)
+                        ##print(energy,ifrac)
+                        transitions.append((energy,ifrac))
+                    last_energy_valid = energy_valid
+                    ###process_transition(energy,ifrac)
+                    #last_ifrac = ifrac
+            prev_sample = sample
+            i = i + 1
+        self.hf_prev_sample = hf_prev_sample
+        self.dcwindow_sum = dcwindow_sum
+        self.dcwindow_pos = dcwindow_pos
+        self.dcblock_prev_x = dcblock_prev_x
+        self.dcblock_prev_y = dcblock_prev_y
+        self.sample_count = n
+        self.prev_sample = prev_sample
+        self.last_energy_valid = last_energy_valid
+        self.ProcessTransitions(transitions)
 
 class KCFile:
+    FRAMES_PER_READ = 65536
+    # The decoded bits are written out a line at a time, so give the output file a large buffer
+    OUTFILE_BUFFER_SIZE = 1<<20
+
     def __init__(self):
         parser = argparse.ArgumentParser(description='Decode KC tape data.')
         parser.add_argument('infile', type=argparse.FileType('rb'), help='Input file to decode')
-        parser.add_argument('-o','--outfile', type=argparse.FileType('w'), default=sys.stdout, help='Output file')
+        parser.add_argument('-o','--outfile', type=argparse.FileType('w', self.OUTFILE_BUFFER_SIZE), default=sys.stdout, help='Output file')
         parser.add_argument('-t','--track', type=int, default=0, help='track number (default=0)')
         parser.add_argument('-b','--bitrate', type=float, default=3000.0, help='nominal bitrate (default=3000.0)')
         parser.add_argument('-g','--energy', type=float, default=3.0, help='energy window (default=3.0 bits)')
-        parser.add_argument('-m','--measure', action='store_true', help='measure mode')
+        parser.add_argument('-m','--measure', action='store_true', help='measure mode, reports the bitrate to pass to --bitrate')
         parser.add_argument('-d','--dcwindow', type=float, default=1.5, help='Window size to remove DC offset and low frequency noise.  Default = 1.5 bits.  Recommended values to be > 1.1 and < 4.5, but avoid number near integers.  Use 0.0 or negative to disable)')
+        parser.add_argument('-p','--dcpole', type=float, default=0.0, help='Pole of a single-pole IIR DC blocking filter, used in place of --dcwindow to remove DC offset and low frequency noise.  Only used if value is in the range of (0.0,1.0), for example 0.995.  Default = 0.0 (disabled)')
         parser.add_argument('-s','--start', type=float, default=0.0, help='Start time, measured in seconds.  Default is the start of input file.')
         parser.add_argument('-e','--end', type=float, default=-1.0, help='End time, measured in seconds.  Default is the end of the input file.')
         parser.add_argument('-f','--highfilter', type=float, default=1.0, help='Simple high frequency filter/attentuator, specified as a decimalized percentage of the signal range that is the max sample-to-sample delta cap.  Only used if value is in the range of (0.0,1.0].  For example, 0.1 means that the sample-to-sample delta would be capped at 10%%.  Default is 1.0 (i.e. 100%% delta is allowed).')
@@ -211,10 +348,7 @@ class KCFile:
         self.sampwidth = None
         self.nframes = None
         self.persample = None
-        self.args.outfile.write('cmds')
-        for arg in sys.argv:
-            self.args.outfile.write(' '+arg)
-        self.args.outfile.write('\n')
+        self.args.outfile.write('cmds '+' '.join(sys.argv)+'\n')
         self.args.outfile.write('args '+str(self.args)+'\n')
         
     def Process(self):
@@ -228,11 +362,14 @@ class KCFile:
         if self.args.track >= self.numtracks:
             print('Error, file only has '+str(self.numtracks)+' tracks.')
             sys.exit(-1)
+
+        # The frames are read as arrays of signed 16-bit samples
+        if self.sampwidth != 2:
+            print('Error, file has '+str(8*self.sampwidth)+'-bit samples, only 16-bit samples are supported.')
+            sys.exit(-1)
     
         self.persample = PerSample(self.args, self.framerate)
         
-        offset = self.args.track*self.sampwidth
-
         # Set up the start and finish frame numbers.
         frameEnd = int( self.args.end * self.framerate )
         if frameEnd < 0:
@@ -242,14 +379,23 @@ class KCFile:
         frameStart = max( 0, frameStart )
         frameStart = min( frameStart, frameEnd )
         if frameStart > 0:
-            wr.readframes(frameStart)
-        for i in range(frameStart, frameEnd):
-            frame = wr.readframes(1)
-            # Get one signed, 16-bit sample
-            sample = frame[offset]+frame[offset+1]*256
-            if sample > 32767:
-                sample = sample - 65536
-            self.persample.Process(i,sample)
+            wr.setpos(frameStart)
+        # Read a block of frames at a time and pick out our track's signed 16-bit samples
+        i = frameStart
+        while i < frameEnd:
+            frames = wr.readframes(min(self.FRAMES_PER_READ, frameEnd-i))
+            if len(frames) == 0:
+                break
+            # wave returns native 16-bit samples, whatever the machine's byte order
+            samples = array('h')
+            samples.frombytes(frames)
+            if self.numtracks > 1:
+                samples = samples[self.args.track::self.numtracks]
+            self.persample.ProcessBlock(i,samples)
+            i = i + len(samples)
+        self.persample.Flush()
+        if self.args.measure:
+            self.persample.pertransition.PrintMeasuredBitrate()
         
 KCFile().Process()
 
@@ -9,34 +9,41 @@ from kcutils import *
 import argparse
 import sys
 import codecs
+import itertools
 
    
 
-def generatePaddedIndicesString( dimensions, indices, statusPrinter ):
+# KC BASIC's tokens, in order from token byte 128 onward
+TOKENS = ('END','FOR','NEXT','DATA','INPUT','DIM','READ','LET','GOTO',
+          'RUN','IF','RESTORE','GOSUB','RETURN','REM','STOP','ON','PLOD','PSAV',
+          'VLOD','VSAV','DEF','SLOD','PRINT','CONT','LIST','CLEAR','PRT',
+          'NEW','TAB(','TO','FN','SPC(','THEN','NOT','STEP','+','-','*','/',
+          '#','AND','OR','>','=','<','SGN','INT','ABS','VER','FRE','POS',
+          'SQR','RND','LOG','EXP','COS','SIN','TAN','ATN','GETC','LEN',
+          'STR$','VAL','ASC','CHR$','LEFT$','RIGHT$','MID$','GO')
+
+def getIndexWidths( dimensions ):
+    """
+    Returns the number of digits needed to print the largest index in each array dimension
+        dimensions  - List of integers, each representing the number of elements in that array dimension
+    """
+    return [ len( str( dimension - 1 ) ) for dimension in dimensions ]
+
+def generatePaddedIndicesString( indexWidths, indices, statusPrinter ):
     """
     Generates a string of the indices where each index has the correct amount of padding
-        dimensions  - List of integers, each representing the number of elements in that array dimension hasPadByte
+        indexWidths - List of integers, each representing the padded width of that array dimension's indices.
+                      See getIndexWidths(), which is computed once per array rather than per element.
         indices     - List of integers, each representing the current index per each array dimension.  The value of
                       indices[i] ranges from 0 to dimensions[i]-1
     Example: a 6 x 5 element array would have dimensions of (6,5) while the current indices could be values from
     (0,0) to (5,4) and the values in-between (2 dimensionally)
     """
-    if len(dimensions) != len(indices):
+    if len(indexWidths) != len(indices):
         statusPrinter.errorExit( 1, "The number of dimensions (%d) did not match the number of indices (%d)" % \
-                                    ( len(dimensions), len(indices) ))
+                                    ( len(indexWidths), len(indices) ))
     
-    result = ""
-    for i in range( len(dimensions) ):
-        dimWidth = 1
-        dimension = dimensions[i] - 1
-        while dimension >= 10:
-            dimension /= 10
-            dimWidth  += 1
-        if i == 0:
-            result += "%*d" % (dimWidth, indices[i])
-        else:
-            result += ",%*d" % (dimWidth, indices[i])
-    return result
+    return ",".join( [ "%*d" % ( width, index ) for width, index in zip( indexWidths, indices ) ] )
 
 #
 # Set up the command-line options
@@ -85,32 +92,29 @@ if blockInfo == None or blockInfo.address == 0x0000 or blockInfo.length == 0 or
    memoryMap.checkStateRange( blockInfo.address, blockInfo.length, MCMemoryMap.STATE_WRITTEN, True ) == False:
     statusPrinter.printStatus(1, "None found.")
 else:
-    tokens = ['END','FOR','NEXT','DATA','INPUT','DIM','READ','LET','GOTO',
-              'RUN','IF','RESTORE','GOSUB','RETURN','REM','STOP','ON','PLOD','PSAV',
-              'VLOD','VSAV','DEF','SLOD','PRINT','CONT','LIST','CLEAR','PRT',
-              'NEW','TAB(','TO','FN','SPC(','THEN','NOT','STEP','+','-','*','/',
-              '#','AND','OR','>','=','<','SGN','INT','ABS','VER','FRE','POS',
-              'SQR','RND','LOG','EXP','COS','SIN','TAN','ATN','GETC','LEN',
-              'STR$','VAL','ASC','CHR$','LEFT$','RIGHT$','MID$','GO']
+    # Translation table from a token byte to its text surrounded by separators.  Bytes below 128 are
+    # ASCII characters, and are passed through by str.translate() as they are.
+    tokenTable = { 128 + i : tokenSeparator + token + tokenSeparator for i, token in enumerate( TOKENS ) }
+    lastToken = 127 + len( TOKENS )
 
     stream = MemoryStreamReader( memoryMap, blockInfo.address, blockInfo.length, statusPrinter )
     offset = stream.read16()
 
     while offset != 0x0000:
+        # Each program line is read up to its terminating 0 and translated in one go
         line = stream.read16()
-        args.outfile.write('%d ' % line )
-        b = stream.read8()
-        startOfLine = 1
-        while b != 0:
-            if b>127:
-                if startOfLine != 1:
-                    args.outfile.write( tokenSeparator )
-                args.outfile.write('%s%s' % ( tokens[b-128], tokenSeparator ) )
-            else:
-                args.outfile.write(chr(b))
-            b = stream.read8()
-            startOfLine = 0
-        args.outfile.write("\n")
+        lineBytes, isTerminated = stream.readUntil(0)
+        if len(lineBytes) > 0 and max(lineBytes) > lastToken:
+            statusPrinter.errorExit( 1, "Unknown BASIC token $%02x in line %d" % ( max(lineBytes), line ) )
+        lineText = lineBytes.decode('latin-1').translate( tokenTable )
+        if len(lineBytes) > 0 and lineBytes[0] > 127:
+            # A token starting a line has no leading separator
+            lineText = lineText[len(tokenSeparator):]
+        if not isTerminated:
+            # Keep the partial line that was read before the end of the block
+            args.outfile.write('%d %s' % ( line, lineText ))
+            statusPrinter.errorExit( 1, "Read off the end of the memory block" )
+        args.outfile.write('%d %s\n' % ( line, lineText ))
         offset = stream.read16()
     pass
     
@@ -132,16 +136,12 @@ else:
     while stream.getRemainingLength() > 0:
         variable = KCBasicUtils.generateVarName( stream, statusPrinter )
         if variable.isString:
-            originalIndex = stream.index
             valueObj = KCBasicUtils.parseString( stream, True, dynamicStringsBlockInfo, args.program_string_offset, \
-                                                 'kcbasic', statusPrinter )
+                                                 'kcbasic', statusPrinter, args.user_display_format )
             typeString = "Dynamic string" if valueObj.isDynamic else "Program string"
             args.varfile.write( "%-3s = %-50s : REM %s\n" % (variable.name, valueObj.value, typeString ) )
-            if valueObj.value.find('CHR$(') >= 0 and args.user_display_format != None:
-                stream.setIndex( originalIndex )
-                valueObj = KCBasicUtils.parseString( stream, True, dynamicStringsBlockInfo, args.program_string_offset, \
-                                                     args.user_display_format, statusPrinter )
-                args.varfile.write( "    %s = %s\n" % ( args.user_display_format, valueObj.value ) )
+            if valueObj.userValue != None:
+                args.varfile.write( "    %s = %s\n" % ( args.user_display_format, valueObj.userValue ) )
         else:
             value = KCBasicUtils.parseNumber( stream, statusPrinter )
             args.varfile.write( "%-3s = %.8G\n" % (variable.name, value) )
@@ -183,38 +183,35 @@ else:
             statusPrinter.errorExit( 1, "Array has mis-matched lengths.  It claims it is %d words but computers to %d words." % \
                                         ( totalLength, computedLength ) )
 
-        # Start with array indices [0,0,0,...,0], using KB BASIC array notation
-        indices = []
-        for i in range(numDimensions):
-            indices.append(0)
+        # Walk the array indices from [0,0,0,...,0], using KB BASIC array notation.
+        # BASIC multi-dimensional arrays are stored in order such that the 1st dimension
+        # is incremented 1st, not the last.  This is the reverse of how C lays its arrays out in memory.
+        # Thus, if AR is a 2D array, then memory is laid out such that AR(0,0) is followed by AR(1,0) and NOT by AR(0,1)
+        # itertools.product increments its last range fastest, so it is given the dimensions reversed.
+        indexWidths = getIndexWidths( dimensions )
+        reversedRanges = [ range( dimension ) for dimension in reversed( dimensions ) ]
         
-        # Finally walk the array's data
-        for i in range(totalElements):
+        # Finally walk the array's data, which is read all at once
+        if variable.isString:
+            values = KCBasicUtils.parseStrings( stream, totalElements, dynamicStringsBlockInfo, args.program_string_offset, \
+                                                'kcbasic', statusPrinter, args.user_display_format )
+        else:
+            values = KCBasicUtils.parseNumbers( stream, totalElements, statusPrinter )
+        # The array's name is the same for every element, so it is formatted into the line formats once.
+        # Variable names are only letters, digits and $, so they never add a % to the formats.
+        stringLineFormat = "    %-3s[%%s] = %%-50s : REM %%s\n" % variable.name
+        numberLineFormat = "    %-3s[%%s] = %%.8G\n" % variable.name
+        userLineFormat   = "        %s = %%s\n" % args.user_display_format
+        write = args.varfile.write
+        for reversedIndices, valueObj in zip( itertools.product( *reversedRanges ), values ):
+            indicesString = generatePaddedIndicesString( indexWidths, reversedIndices[::-1], statusPrinter )
             if variable.isString:
-                originalIndex = stream.index
-                valueObj = KCBasicUtils.parseString( stream, False, dynamicStringsBlockInfo, args.program_string_offset, \
-                                                     'kcbasic', statusPrinter )
                 typeString = "Dynamic string" if valueObj.isDynamic else "Program string"
-                args.varfile.write( "    %-3s[%s] = %-50s : REM %s\n" % \
-                                            ( variable.name, generatePaddedIndicesString( dimensions, indices, statusPrinter ), \
-                                              valueObj.value, typeString ) )
-                if valueObj.value.find('CHR$(') >= 0 and args.user_display_format != None:
-                    stream.setIndex( originalIndex )
-                    valueObj = KCBasicUtils.parseString( stream, False, dynamicStringsBlockInfo, args.program_string_offset, \
-                                                         args.user_display_format, statusPrinter )
-                    args.varfile.write( "        %s = %s\n" % ( args.user_display_format, valueObj.value ) )
+                write( stringLineFormat % ( indicesString, valueObj.value, typeString ) )
+                if valueObj.userValue != None:
+                    write( userLineFormat % valueObj.userValue )
             else:
-                value = KCBasicUtils.parseNumber( stream, statusPrinter )
-                args.varfile.write( "    %-3s[%s] = %.8G\n" % ( variable.name, \
-                                            generatePaddedIndicesString( dimensions, indices, statusPrinter ), value) )
-            # The below code is correct.  BASIC multi-dimensional arrays are stored in order such that the 1st dimension
-            # is incremented 1st, not the last.  This is the reverse of how C lays its arrays out in memory.
-            # Thus, if AR is a 2D array, then memory is laid out such that AR(0,0) is followed by AR(1,0) and NOT by AR(0,1)
-            for j in range(numDimensions):
-                indices[j] = indices[j] + 1
-                if indices[j] < dimensions[j] :
-                    break
-                indices[j] = 0
+                write( numberLineFormat % ( indicesString, valueObj ) )
 
 #
 # Exit successfully
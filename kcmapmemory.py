@@ -17,7 +17,8 @@ Created: Wed Dec 30 2020
 Author: Chris Dreher
 """
 
-from kcutils import *
+import argparse
+from kcutils import KCStatusPrinter, MCMemoryMap, BinCfgFilePair, KCRODataRecordReader, KCBasicRecordReader
 
         
 def main():
@@ -8,15 +8,21 @@ Created on Sun Feb 12 16:45:48 2017
 # Convert .tap file to .wav
 
 import argparse
+from array import array
+import mmap
 import sys
 import wave
 
 class KCFile:
+    # Input bytes converted per block.  Each pair of bytes becomes 8 stereo frames (32 bytes) of output.
+    BYTES_PER_BLOCK = 1<<16
+
     def __init__(self):
         parser = argparse.ArgumentParser(description='Decode KC tap file to wav.')
         parser.add_argument('infile', type=argparse.FileType('rb'), help='Input file to decode')
         parser.add_argument('outfile', type=argparse.FileType('wb'), help='Output file')
         self.args = parser.parse_args()
+        self.channel_table = self.BuildChannelTable()
     
     def Handle(self, sign, data, present, bit):
         mag = 30000
@@ -32,11 +38,47 @@ class KCFile:
             data.append(sign*mag)
         return sign
 
-    def BuildFrame(self, frame, newvals):
-        for newval in newvals:
-            frame = frame + newval.to_bytes(2, byteorder='little', signed=True)
-        return frame
-        
+    def BuildChannelTable(self):
+        "Decodes every byte value for both starting signs, indexed by [sign][byte] as (sample bytes, new sign)"
+        # Every sample and sign change is relative to the channel's sign, so each byte is only decoded
+        # from a positive sign.  Starting from a negative sign negates the samples and the new sign.
+        positive_entries = []
+        negative_entries = []
+        for byte in range(0, 256):
+            data = []
+            new_sign = 1
+            # Each byte holds 4 (present, bit) pairs, starting from the high bits
+            bits = [int(c) for c in format(byte, '08b')]
+            for present, bit in zip(bits[0::2], bits[1::2]):
+                new_sign = self.Handle(new_sign, data, present, bit)
+            # The samples are kept as the bytes of a native 16-bit array, ready to be joined
+            positive_entries.append((array('h', data).tobytes(), new_sign))
+            negative_entries.append((array('h', [-sample for sample in data]).tobytes(), -new_sign))
+        return {1: positive_entries, -1: negative_entries}
+
+    def DecodeChannel(self, channel_bytes, sign):
+        "Returns the samples for one channel's bytes as an array of 16-bit samples, and the channel's new sign"
+        channel_table = self.channel_table
+        parts = []
+        append = parts.append
+        for byte in channel_bytes:
+            data, sign = channel_table[sign][byte]
+            append(data)
+        samples = array('h')
+        samples.frombytes(b''.join(parts))
+        return samples, sign
+
+    def ReadInput(self):
+        "Returns the whole input file as a bytes-like object, memory mapped when the file allows it"
+        try:
+            rawdata = mmap.mmap(self.args.infile.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            # Pipes and empty files can't be mapped
+            return self.args.infile.read()
+        if hasattr(mmap, 'MADV_SEQUENTIAL'):
+            rawdata.madvise(mmap.MADV_SEQUENTIAL)
+        return rawdata
+
     def Process(self):
 
         ww = wave.Wave_write(self.args.outfile)
@@ -45,25 +87,28 @@ class KCFile:
         ww.setframerate(6000)
         ww.setsampwidth(2)
         
-        rawdata = self.args.infile.read(2)
+        # Read the whole file at once.  The bytes alternate between the 2 channels, and
+        # any odd byte left at the end is dropped.
+        rawdata = self.ReadInput()
+        end = len(rawdata) & ~1
+        # Each pair of bytes becomes 8 frames.  With the frame count known up front, the header is
+        # written correctly the first time, and doesn't need to be patched (or the output seekable).
+        ww.setnframes(4*end)
         sign0 = 1
         sign1 = 1
-        while len(rawdata) == 2:
-            data0 = []
-            data1 = []
-            sign0 = self.Handle(sign0, data0, rawdata[0] & 0x80, rawdata[0] & 0x40)
-            sign1 = self.Handle(sign1, data1, rawdata[1] & 0x80, rawdata[1] & 0x40)
-            sign0 = self.Handle(sign0, data0, rawdata[0] & 0x20, rawdata[0] & 0x10)
-            sign1 = self.Handle(sign1, data1, rawdata[1] & 0x20, rawdata[1] & 0x10)
-            sign0 = self.Handle(sign0, data0, rawdata[0] & 0x08, rawdata[0] & 0x04)
-            sign1 = self.Handle(sign1, data1, rawdata[1] & 0x08, rawdata[1] & 0x04)
-            sign0 = self.Handle(sign0, data0, rawdata[0] & 0x02, rawdata[0] & 0x01)
-            sign1 = self.Handle(sign1, data1, rawdata[1] & 0x02, rawdata[1] & 0x01)
-                            
-            frame = bytearray([])
-            frame = self.BuildFrame(frame,[x for t in zip(data0, data1) for x in t]) 
-            ww.writeframes(frame)
-            
-            rawdata = self.args.infile.read(2)
+        for start in range(0, end, self.BYTES_PER_BLOCK):
+            stop = min(start + self.BYTES_PER_BLOCK, end)
+            # Each channel only depends on its own bytes, so the channels are decoded separately
+            # and then interleaved into stereo frames
+            samples0, sign0 = self.DecodeChannel(rawdata[start:stop:2], sign0)
+            samples1, sign1 = self.DecodeChannel(rawdata[start+1:stop:2], sign1)
+            # Concatenating gives an array of the right size without a zero filled temporary
+            frames = samples0 + samples1
+            frames[0::2] = samples0
+            frames[1::2] = samples1
+            # The array already holds interleaved native 16-bit frames, which is what wave expects,
+            # so it is written as it is
+            ww.writeframesraw(frames)
+        ww.close()
         
 KCFile().Process()
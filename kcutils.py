@@ -6,10 +6,12 @@ Created on Wed Dec 30 2020
 """
 
 from array import *
+import collections
+import math
 import os.path
-import argparse
 import sys
 import re
+import struct
 
 
 
@@ -19,6 +21,9 @@ class KCStatusPrinter:
     Note: might be expanded for advanced logging, but for now is a simple implementation.
     """
 
+    # Indentation for each indentLevel, built once rather than padding every line
+    _INDENTS = tuple( ' ' * ( 4 * i ) for i in range( 0, 16 ) )
+
     def __init__(self, doPrintStatus ):
         """
         Initializer
@@ -26,14 +31,31 @@ class KCStatusPrinter:
         """
         self.doPrintStatus = doPrintStatus
     
-    def printStatus(self, indentLevel, text ):
+    def printStatus(self, indentLevel, text, *args ):
         """
         Simple status printer
             indentLevel   - Integer >= 0 of how many levels to indent by.  Each level indents multiple spaces
-            text          - String to print
+            text          - String to print.  If args are given, it is a %-format string for them.
+            args          - Optional values for text.  They are only formatted if the text is printed.
+        """
+        if self.doPrintStatus:
+            if args:
+                text = text % args
+            indents = self._INDENTS
+            print( ( indents[indentLevel] if indentLevel < len( indents ) else ' ' * ( 4 * indentLevel ) ) + text )
+
+    def printStatusLines(self, indentLevel, lines ):
+        """
+        Prints several status lines at the same indentLevel with a single print.  Same as calling printStatus() for each line.
+            indentLevel   - Integer >= 0 of how many levels to indent by.  Each level indents multiple spaces
+            lines         - Iterable of strings to print
         """
         if self.doPrintStatus:
-            print( text.rjust( len(text) + 4 * indentLevel ) )
+            indents = self._INDENTS
+            indent  = indents[indentLevel] if indentLevel < len( indents ) else ' ' * ( 4 * indentLevel )
+            text    = '\n'.join( indent + line for line in lines )
+            if len( text ) > 0:
+                print( text )
             
     def errorPrint( self, exitMessage ):
         """
@@ -59,6 +81,10 @@ class MCMemoryMap:
     SIZE           = 65536
     STATE_EMPTY    = 0
     STATE_WRITTEN  = 1
+    _STATE_DIGITS  = bytes.maketrans( b'\x00\x01', b'01' )
+    _LOW_BYTE_POS  = 0 if sys.byteorder == 'little' else 1    # Position of a word's low byte in its native-order bytes
+    _WRITTEN_STATES = memoryview( bytes( [ STATE_WRITTEN ] ) * SIZE )  # Sliced to mark ranges as written without building a buffer each time
+    DEBUG_ALIGN    = False      # Set to True to log the whole state map after alignMemoryBlock()
 
     def __init__(self, canOverwrite, statusPrinter):
         """
@@ -68,13 +94,13 @@ class MCMemoryMap:
         """
         self._canOverwrite  = not ( canOverwrite == False or canOverwrite == None )
         self._printer       = statusPrinter
-        # Initialize the 2 arrays
-        self._data          = array('H')
-        self._state         = array('B')
-        self._data.append(0)
-        self._data          *= self.SIZE
-        self._state.append(self.STATE_EMPTY)
-        self._state         *= self.SIZE
+        # Initialize the 2 arrays directly from zero-filled buffers (STATE_EMPTY is 0).  The states are kept in a
+        # bytearray, so that they can be searched and counted with the C-level bytes methods.
+        self._data          = array('H', bytes( 2 * self.SIZE ))
+        self._state         = bytearray( self.SIZE )
+        # When overwriting is allowed, every write is legal, so skip the legality checks entirely
+        if self._canOverwrite:
+            self.writeWord  = self._writeWordPermissive
 
     def readWord( self, address ):
         """
@@ -88,25 +114,48 @@ class MCMemoryMap:
         """
         return self._data[address] & 0xff
         
+    def readLowBytes( self, address, length ):
+        """
+        Returns the lower bytes of the values stored at length sequential addresses, as a bytes object.
+        """
+        # Rather than masking each word, take every other byte of the words' native-order bytes
+        return self._data[address:address + length].tobytes()[self._LOW_BYTE_POS::2]
+
+    def readWordsBE( self, address, length ):
+        """
+        Returns the values stored at length sequential addresses as a bytes object, with each word in big-endian order.
+        """
+        words = self._data[address:address + length]
+        if sys.byteorder == 'little':
+            words.byteswap()
+        return words.tobytes()
+
     def readLowBytesAsWord( self, address ):
         """
         Reads a word from 2 sequential addresses in little-endian order.
         """
-        return ( self.readLowByte( address + 1 ) << 8 ) | self.readLowByte( address )
+        low, high = self._data[address:address + 2]
+        return ( ( high & 0xff ) << 8 ) | ( low & 0xff )
 
     def writeWord( self, address, dataWord, forceOverwrite=False ):
         """
         Writes the data value to the specified address, if it is legal to do so.
         """
         # print( "    $%04x = $%04x" % (address, dataWord) )  # Noisy debug printing
-        if self._canOverwrite == True or forceOverwrite == True or \
-           self._state[address] == self.STATE_EMPTY or self._data[address] == dataWord:
+        if forceOverwrite == True or self._state[address] == self.STATE_EMPTY or self._data[address] == dataWord:
             self._data[address]  = dataWord
             self._state[address] = self.STATE_WRITTEN
         else:
             self._printer.errorExit( 1, 'Attempted to overwrite address $%04x that contains data of $%04x with the data $%04x' % \
                                         ( address, self._data[address], dataWord ) )
 
+    def _writeWordPermissive( self, address, dataWord, forceOverwrite=False ):
+        """
+        Writes the data value to the specified address without any checks.  Replaces writeWord() when overwriting is allowed.
+        """
+        self._data[address]  = dataWord
+        self._state[address] = self.STATE_WRITTEN
+
     def writeLowBytesAsWord( self, address, dataWord, forceOverwrite=False ):
         """
         Writes the data word to 2 sequential addresses in little-endian order.
@@ -124,8 +173,38 @@ class MCMemoryMap:
         bufferEnd = bufferStart + bufferLenInBytes
         if bufferEnd > len( bufferData ):
             self._printer.errorExit( 2, 'The buffer end index is larger than the BIN file\'s length.  Original text: %s' % originalText )
-        for i in range( bufferStart, bufferEnd, 2 ):
-            self.writeWord( address + ( ( i - bufferStart ) >> 1 ), ( ( bufferData[i] & 0xff) << 8 ) | ( bufferData[i+1] & 0xff), forceOverwrite )
+        # The buffer holds big-endian words.  Convert all of them at once, then copy them in with slices.
+        lengthInWords = ( bufferLenInBytes + 1 ) >> 1
+        wordBytes     = memoryview( bufferData )[bufferStart:bufferStart + 2 * lengthInWords]    # A view, so nothing is copied yet
+        if len( wordBytes ) != 2 * lengthInWords:
+            self._printer.errorExit( 2, 'The buffer end index is larger than the BIN file\'s length.  Original text: %s' % originalText )
+        if address + lengthInWords > self.SIZE:
+            self._printer.errorExit( 2, 'The buffer does not fit in the memory map at address $%04x.  Original text: %s' % \
+                                        ( address, originalText ) )
+        words = array( 'H' )
+        words.frombytes( wordBytes )
+        if sys.byteorder == 'little':
+            words.byteswap()
+        addressEnd = address + lengthInWords
+        # Only addresses that were already written can be illegal, so look for the first one that changes
+        firstWritten = -1
+        if not ( self._canOverwrite == True or forceOverwrite == True ):
+            firstWritten = self._state.find( self.STATE_WRITTEN, address, addressEnd )
+        # Compare each run of written addresses with one slice comparison.  Only a run that differs is searched word by word.
+        runStart = firstWritten
+        while runStart >= 0:
+            runEnd = self._state.find( self.STATE_EMPTY, runStart, addressEnd )
+            if runEnd < 0:
+                runEnd = addressEnd
+            if self._data[runStart:runEnd] != words[runStart - address:runEnd - address]:
+                for i in range( runStart, runEnd ):
+                    dataWord = words[i - address]
+                    if self._data[i] != dataWord:
+                        self._printer.errorExit( 1, 'Attempted to overwrite address $%04x that contains data of $%04x with the data $%04x' % \
+                                                    ( i, self._data[i], dataWord ) )
+            runStart = self._state.find( self.STATE_WRITTEN, runEnd, addressEnd )
+        self._data[address:addressEnd]  = words
+        self._state[address:addressEnd] = self._WRITTEN_STATES[:lengthInWords]
 
     def getWordState( self, address ):
         """
@@ -133,6 +212,20 @@ class MCMemoryMap:
         """
         return self._state[address]
         
+    def getWrittenRanges( self ):
+        """
+        Returns a list of ( startAddress, endAddress ) tuples for each run of written addresses.  endAddress is exclusive.
+        """
+        ranges  = []
+        address = self._state.find( self.STATE_WRITTEN )
+        while address >= 0:
+            endAddress = self._state.find( self.STATE_EMPTY, address )
+            if endAddress < 0:
+                endAddress = self.SIZE
+            ranges.append( ( address, endAddress ) )
+            address = self._state.find( self.STATE_WRITTEN, endAddress )
+        return ranges
+
     def checkStateRange( self, address, lengthInWords, state, mustMatch ):
         """
         Returns boolean whether every word in the address range is in the expected state.  Can check negative states.
@@ -143,10 +236,11 @@ class MCMemoryMap:
                               True means that the state of all the addresses must BE the same at the state passed in.
                               False means that the state of all the addresses must NOT BE the same at the state passed in.
         """
-        for i in range( address, address + lengthInWords ):
-            if ( self._state[i] == state ) != mustMatch:
-                return False
-        return True
+        # Count the matching states over the whole range at once, rather than testing each address
+        matchCount = self._state.count( state, address, address + lengthInWords )
+        if mustMatch:
+            return matchCount == lengthInWords
+        return matchCount == 0
         
     def alignMemoryBlock( self, blockSize ):
         """
@@ -155,32 +249,29 @@ class MCMemoryMap:
         """
         if blockSize <= 1:
             return
-        mask        = ( self.SIZE - 1 ) & ~( ( 1 << blockSize ) - 1 )
-        foundWrite  = False
-        for address in range( 0, self.SIZE ):
-            if address == ( address & mask ):
-                foundWrite = False
-            if foundWrite == False and self._state[address] == self.STATE_WRITTEN:
-                # Update the previous addresses
-                for settingAddress in range( address & mask, address ):
-                    self._state[settingAddress] = self.STATE_WRITTEN
-                foundWrite = True
-            if foundWrite == True:
-                self._state[address] = self.STATE_WRITTEN
-        debugPrintState()
+        # A block with any written address becomes entirely written.  Rather than checking every block, jump straight
+        # to the next written address and fill its whole block with one slice.
+        blockLength  = min( 1 << blockSize, self.SIZE )
+        writtenBlock = self._WRITTEN_STATES[:blockLength]
+        address      = 0
+        while address < self.SIZE:
+            address = self._state.find( self.STATE_WRITTEN, address )
+            if address < 0:
+                break
+            blockStart = address & ~( blockLength - 1 )
+            self._state[blockStart:blockStart + blockLength] = writtenBlock
+            address = blockStart + blockLength
+        if self.DEBUG_ALIGN and self._printer.doPrintStatus:
+            self.debugPrintState()
                
     def debugPrintState(self):
         """
         Logs the entire memory map's state.
         """
-        logLine = None
-        for address in range( 0, self.SIZE ):
-            if address % 64 == 0:
-                logLine = '$%04x : ' % address
-            logLine += '%d' % self._state[address]
-            if address % 64 == 63:
-                self._printer.printStatus( 1, logLine )
-                logLine = None
+        # Translate every state to its digit at once, then log it 64 states per line
+        stateDigits = self._state.translate( self._STATE_DIGITS ).decode( 'ascii' )
+        self._printer.printStatusLines( 1, ( '$%04x : %s' % ( address, stateDigits[address:address + 64] ) \
+                                             for address in range( 0, self.SIZE, 64 ) ) )
 
 
 
@@ -188,44 +279,93 @@ class MemoryStreamReader:
     """
     Class that treats a memory block as a stream of bytes/decles/words
     """
+    READ_UNTIL_CHUNK_SIZE = 64
+
+    # The reads are called once per decle, so the attributes are fixed slots and the
+    # memory map's words are referenced directly
+    __slots__ = ( 'memoryMap', 'startAddress', 'length', 'index', 'statusPrinter', '_data' )
+
     def __init__(self, memoryMap, startAddress, length, statusPrinter ):
         self.memoryMap      = memoryMap
         self.startAddress   = startAddress
         self.length         = length
         self.index          = 0
         self.statusPrinter  = statusPrinter
+        self._data          = memoryMap._data
         
     def read10(self):
         """
         Returns a decle from memory, advances the read head.
         """
-        if self.index >= self.length:
+        index = self.index
+        if index >= self.length:
             self.statusPrinter.errorExit( 1, "Read off the end of the memory block" )
-        value = self.memoryMap.readWord( self.startAddress + self.index )
-        self.index += 1
-        return value
+        self.index = index + 1
+        return self._data[self.startAddress + index]
 
     def read8(self):
         """
         Returns the lower byte from a memory location, advances the read head.
         """
-        return self.read10() & 0xff
+        index = self.index
+        if index >= self.length:
+            self.statusPrinter.errorExit( 1, "Read off the end of the memory block" )
+        self.index = index + 1
+        return self._data[self.startAddress + index] & 0xff
 
     def read16(self):
         """
         Returns a word from memory by reading 2 bytes, advances the read head.
         """
-        low  = self.read8()
-        high = self.read8()
-        return ( high << 8 ) | low
+        return int.from_bytes( self.readBytes( 2 ), 'little' )
 
     def read16BE(self):
         """
         Returns a word from memory by reading 2 bytes in BIG-endian format, advances the read head.
         """
-        high = self.read8()
-        low  = self.read8()
-        return ( high << 8 ) | low
+        return int.from_bytes( self.readBytes( 2 ), 'big' )
+
+    def readBytes(self, length):
+        """
+        Returns the lower bytes of length decles from memory as a bytes object, advances the read head past all of them.
+        """
+        if length > self.getRemainingLength():
+            self.statusPrinter.errorExit( 1, "Read off the end of the memory block" )
+        data = self.memoryMap.readLowBytes( self.startAddress + self.index, length )
+        self.index += length
+        return data
+
+    def readUntil(self, terminator):
+        """
+        Returns a tuple of the lower bytes up to, but not including, the terminator byte as a bytes object, and a
+        boolean of whether the terminator was found.  Advances the read head past the terminator.  If the block ends
+        first, all the bytes up to the end are returned with False, so the caller can use them before reporting the
+        error.  Memory is read a chunk at a time, rather than one byte at a time.
+        """
+        data = b''
+        while True:
+            if self.index >= self.length:
+                return ( data, False )
+            chunkLength = min( self.READ_UNTIL_CHUNK_SIZE, self.length - self.index )
+            chunk = self.memoryMap.readLowBytes( self.startAddress + self.index, chunkLength )
+            end = chunk.find( terminator )
+            if end >= 0:
+                self.index += end + 1
+                return ( data + chunk[:end], True )
+            data += chunk
+            self.index += chunkLength
+
+    def readStructArray(self, format, count):
+        """
+        Returns an iterator of count tuples, unpacked from the lower bytes using the struct module's format string.  All
+        the complete tuples that fit in the block are read in one read, and advance the read head.  If the block ends
+        before count tuples, the error is reported after the readable tuples have been iterated.
+        """
+        size      = struct.calcsize( format )
+        available = min( count, self.getRemainingLength() // size )
+        yield from struct.iter_unpack( format, self.readBytes( size * available ) )
+        if available < count:
+            self.statusPrinter.errorExit( 1, "Read off the end of the memory block" )
 
     def getRemainingLength(self):
         """
@@ -380,6 +520,8 @@ class KCBasicUtils:
                            127:'^DELETE_PREVIOUS^' }
                             # Note: the ` is incorrectly documented as 31.  It is the
                             # only displayable character in the control character range.
+    # controlCharsDict indexed by character, with None for the characters it does not have
+    controlChars = tuple( map( controlCharsDict.get, range( 0, 128 ) ) )
 
     # KC's displayable characters, separated by output formats
     # Note: 127 is KC displayable but ONLY as a 3-byte escape sequence
@@ -390,40 +532,37 @@ class KCBasicUtils:
     del formatDicts['ascii'][0x5E]   # the UP_ARROW KC character is not ASCII
     del formatDicts['ascii'][0x60]   # the CENTS KC character is not ASCII
     # ansi format.
-    formatDicts['ansi'] = dict( list( formatDicts['ascii'].items() ) +              \
-                                list( {  1:0x00A1, 13:0x00E7, 14:0x00F1, 15:0x00BF, \
-                                        16:0x00E4, 17:0x00E2, 18:0x00E0, 19:0x00E1, \
-                                        20:0x00EA, 21:0x00E8, 22:0x00E9, 23:0x00EE, \
-                                        24:0x00ED, 25:0x00F6, 26:0x00F4, 27:0x00F3, \
-                                        28:0x00FC, 29:0x00FB, 30:0x00F9, 31:0x00FA, \
-                                        96:0x00A2,127:0x00A2                        }.items() ) )
+    formatDicts['ansi'] = dict( formatDicts['ascii'] )
+    formatDicts['ansi'].update( {  1:0x00A1, 13:0x00E7, 14:0x00F1, 15:0x00BF, \
+                                  16:0x00E4, 17:0x00E2, 18:0x00E0, 19:0x00E1, \
+                                  20:0x00EA, 21:0x00E8, 22:0x00E9, 23:0x00EE, \
+                                  24:0x00ED, 25:0x00F6, 26:0x00F4, 27:0x00F3, \
+                                  28:0x00FC, 29:0x00FB, 30:0x00F9, 31:0x00FA, \
+                                  96:0x00A2,127:0x00A2                        } )
     # win-console format
     # Note: Supported Unicode codepoints based on the Consolas, Courier New, and Lucida Console fonts.
-    formatDicts['win-console'] =  dict( list( formatDicts['ansi'].items() ) +               \
-                                        list( {  0:0x2193,  2:0x201E,  3:0x250C,  4:0x2500, \
-                                                 5:0x2510,  6:0x2514,  7:0x2518,  8:0x252C, \
-                                                 9:0x2534, 10:0x251C, 11:0x2524, 12:0x253C, \
-                                                94:0x2191                                   }.items() ) )
+    formatDicts['win-console'] = dict( formatDicts['ansi'] )
+    formatDicts['win-console'].update( {  0:0x2193,  2:0x201E,  3:0x250C,  4:0x2500, \
+                                          5:0x2510,  6:0x2514,  7:0x2518,  8:0x252C, \
+                                          9:0x2534, 10:0x251C, 11:0x2524, 12:0x253C, \
+                                         94:0x2191                                   } )
     # braille format
-    formatDicts['braille'] =  dict( list( formatDicts['win-console'].items() ) )
-    for i in range( 0, 64 ):
-        # Mapping KC's braille order to Unicode codepoints is... interesting.
-        # KC bit indices of 543210 are re-ordered to 531420.
-        value = 0x2800 + ( i & 0x21 | (( i & 0x10 ) >> 2 ) | (( i & 0x04 ) >> 1 ) | \
-                                      (( i & 0x08 ) << 1 ) | (( i & 0x02 ) << 2 ) )
-        formatDicts['braille'] =  dict( list( formatDicts['braille'].items() ) + \
-                                        list( { 192+i:value }.items() ) )
+    # Mapping KC's braille order to Unicode codepoints is... interesting.
+    # KC bit indices of 543210 are re-ordered to 531420.
+    formatDicts['braille'] = dict( formatDicts['win-console'] )
+    formatDicts['braille'].update( { 192+i: 0x2800 + ( i & 0x21 | (( i & 0x10 ) >> 2 ) | (( i & 0x04 ) >> 1 ) | \
+                                                                (( i & 0x08 ) << 1 ) | (( i & 0x02 ) << 2 ) ) \
+                                     for i in range( 0, 64 ) } )
     # unicode format
-    formatDicts['unicode'] =  dict( list( formatDicts['braille'].items() ) +    \
-                                    list( { 128:0x0020, 149:0x258C, 170:0x2590, 191:0x2588 }.items() ) )
-    for i in range(  1, 63 ):
-        # Unicode 0x1FBXX range skips a symbol every 21 codepoints, since the skipped codepoints are 
-        # already defined elsewhere.  Thus, we have to adjust the offset.
-        if i % 21 == 0:
-            continue
-        offset = 1 + i // 21
-        formatDicts['unicode'] =  dict( list( formatDicts['unicode'].items() ) + \
-                                        list( { 128+i:0x1FB00+i-offset }.items() ) )
+    # Unicode 0x1FBXX range skips a symbol every 21 codepoints, since the skipped codepoints are 
+    # already defined elsewhere.  Thus, we have to adjust the offset.
+    formatDicts['unicode'] = dict( formatDicts['braille'] )
+    formatDicts['unicode'].update( { 128:0x0020, 149:0x258C, 170:0x2590, 191:0x2588 } )
+    formatDicts['unicode'].update( { 128+i: 0x1FB00 + i - ( 1 + i // 21 ) for i in range( 1, 63 ) if i % 21 != 0 } )
+
+    # Flat look-up tables of the above, indexed by KC character.  Each entry is the decoded character, or None.
+    formatLuts = { name: [ chr( codepoints[c] ) if c in codepoints else None for c in range( 0, 256 ) ] \
+                   for name, codepoints in formatDicts.items() }
 
     # A few shorthand constants to ease building the hardcodedStrings
     TB      = controlCharsDict[9]
@@ -437,7 +576,7 @@ class KCBasicUtils:
     # The 2nd dimension is the lower-case string and the upper-case string.
     #   index 0     The "lower case" string.  Note that a few strings are not truly all lower case.
     #   index 1     The UPPER case string.  If a string, then that is the value.
-    #               If None, then the lower case string is made all upper case.
+    #               If None, then the lower case string is made all upper case.  This is done once, below the table.
     hardcodedStrings = [
         [ None,                     None                    ],  # Placeholder, never used.
         [ CR+LF,                    None                    ],
@@ -479,6 +618,8 @@ class KCBasicUtils:
         [ 'K. Smith',               None                    ],  # Undocumented
         [ 'L. Zwick',               None                    ],  # Undocumented
     ]
+    hardcodedStrings = [ [ lower, upper if upper != None or lower == None else lower.upper() ] \
+                         for lower, upper in hardcodedStrings ]
     
     flagNames = {
          1:'TYPING_ECHO',
@@ -490,11 +631,22 @@ class KCBasicUtils:
         36:'OVERFLOW_TO_NEXT_LINE',
         40:'HIDE_CHARS_AND_CURSOR'
     }
+    # The decoded flag escape sequences, keyed by the flag's value with its ON bit ($10)
+    flagSnippets = { flagValue | onBit: '^%s_%s^' % ( flagName, onOffString ) \
+                     for flagValue, flagName in flagNames.items() \
+                     for onBit, onOffString in ( ( 0x00, 'OFF' ), ( 0x10, 'ON' ) ) }
+
+    # Byte values whose characters are letters, i.e. the legal first characters of a variable's name
+    varNameFirstChars = frozenset( c for c in range( 0, 256 ) if chr( c ).isalpha() )
+
+    # Results of generateVarName() and parseString()
+    VarName     = collections.namedtuple( 'VarName', ( 'name', 'isString' ) )
+    StringValue = collections.namedtuple( 'StringValue', ( 'value', 'userValue', 'isDynamic' ) )
 
     def generateVarName( memoryStream, statusPrinter ):
         """
         Given a memory stream, read the 2 bytes for a variable's name, and generate the correct string for the variable's name
-        Returns object that contains 'name' and 'isString' boolean
+        Returns a VarName that contains 'name' and 'isString' boolean
         """
         IS_STRING_MASK = 0x80
         
@@ -506,24 +658,21 @@ class KCBasicUtils:
         
         if name1 == 0:
             statusPrinter.errorExit( 1, "Variable's name started with 0x00" )
-        name = "%c" % name1
-        if not name.isalpha():
-            statusPrinter.errorExit( 1, "Variable's 1st name character is an illegal character: %s" % name )
+        if name1 not in KCBasicUtils.varNameFirstChars:
+            statusPrinter.errorExit( 1, "Variable's 1st name character is an illegal character: %c" % name1 )
+        name = chr( name1 )
 
         if name2 != 0:
-            name += "%c" % name2
-            if not name.isalnum():
+            name += chr( name2 )
+            # The 2nd character is 7 bits, so only ASCII letters and digits are legal
+            if not ( ( name2 >= 0x30 and name2 <= 0x39 ) or ( name2 >= 0x41 and name2 <= 0x5A ) or ( name2 >= 0x61 and name2 <= 0x7A ) ):
                 statusPrinter.errorExit( 1, "Variable's name containg illegal characters: %s%s" % 
                                             ( name, "$" if isString else "" ) )
 
         if isString:
             name = name + "$"
             
-        class Result: pass
-        result = Result()
-        result.name     = name
-        result.isString = isString
-        return result
+        return KCBasicUtils.VarName( name, isString )
 
     def parseNumber( memoryStream, statusPrinter ):
         """
@@ -555,20 +704,37 @@ class KCBasicUtils:
         #                                             ... where the decimal point does not shift either way (80 00 00 00 = 1/2)
         #                                         Decimal point is placed BEFORE the leading one.  Exponent is left-shift amount.
 
+        number   = memoryStream.readBytes( 4 )
+        exponent = number[0]
+        mantissa = int.from_bytes( number[1:4], 'big' )
+        return KCBasicUtils.decodeNumber( exponent, mantissa )
+
+    def parseNumbers( memoryStream, count, statusPrinter ):
+        """
+        Parses count consecutive numbers from the memory stream in one read, returns an iterator of their values.
+        See parseNumber() for the number format.  Each number is decoded as it is iterated, so the numbers before a
+        read off the end of the block are returned before the error is reported, the same as parseNumber().
+        """
+        return ( KCBasicUtils.decodeNumber( number >> 24, number & 0xffffff ) \
+                 for ( number, ) in memoryStream.readStructArray( '>I', count ) )
+
+    def decodeNumber( exponent, mantissa ):
+        """
+        Returns the value of a number from its exponent byte and 24-bit mantissa.  See parseNumber() for the format.
+        """
         SIGN_MASK       = 0x800000
         ZERO_EXP_OFFSET = 0x80
         
-        exponent = memoryStream.read8() - ZERO_EXP_OFFSET
-        mantissa = (memoryStream.read8() << 16) | (memoryStream.read8() << 8) | memoryStream.read8()
+        exponent = exponent - ZERO_EXP_OFFSET
         sign     = 1 if ( mantissa & SIGN_MASK ) == 0 else -1
         mantissa = mantissa | SIGN_MASK     # Force the leading 1 to be set
         
         if exponent == -ZERO_EXP_OFFSET:
             return 0
-        mantissa *= 1.0     # Make sure the number is floating-point, not 100% sure this is necessary.
-        return sign * ( mantissa / SIGN_MASK ) * ( 2 ** ( exponent - 1 ))
+        # The mantissa is a 24-bit fraction, so scale it by its exponent in one step
+        return math.ldexp( sign * mantissa, exponent - 1 - 23 )
 
-    def parseString( memoryStream, hasPadByte, dynamicStringsBlockInfo, programStringOffset, format, statusPrinter ):
+    def parseString( memoryStream, hasPadByte, dynamicStringsBlockInfo, programStringOffset, format, statusPrinter, userFormat=None ):
         """
         Parses a string from the memory stream, returns KC BASIC representation.  hasPadByte is a boolean.
             memoryStream            - MemoryStreamReader that is expected to be pointing at a string structure
@@ -591,7 +757,9 @@ class KCBasicUtils:
                                         unicode     User display format.  Adds Unicode range 1FB00-1FB1D which is the
                                                     "Symbols for Legacy Computing" with 2x3 blocks.  Few fonts support this range.
             statusPrinter           - KCStatusPrinter for logging and errors
-        Returns object that contains 'value' (string) and 'isDynamic' (boolean)
+            userFormat              - Optional user display format.  If format is 'kcbasic' and the string needed any CHR$()
+                                      escapes, the string is also decoded in this format, without re-reading the stream.
+        Returns a StringValue that contains 'value' (string), 'userValue' (string or None) and 'isDynamic' (boolean)
         
         Note: Internally, the string pointer address is adjusted to the MC range, not the raw stored KC range.
         """
@@ -601,24 +769,38 @@ class KCBasicUtils:
         #   word   String's address in little-endian format
         #   byte   Optional padding byte with value 0x00
 
-        length  = memoryStream.read8()
-        address = memoryStream.read16() + KCBasicRecordReader.KC_TO_MC_OFFSET
+        structure = memoryStream.readBytes( 4 if hasPadByte else 3 )
+        length    = structure[0]
+        address   = int.from_bytes( structure[1:3], 'little' ) + KCBasicRecordReader.KC_TO_MC_OFFSET
         if hasPadByte:
-            padByte = memoryStream.read8()
+            padByte = structure[3]
             if padByte != 0x00:
                 statusPrinter.errorExit( 1, "String's pad byte was $02x instead of $00" % padByte )
+        return KCBasicUtils.decodeString( memoryStream.memoryMap, length, address, dynamicStringsBlockInfo, \
+                                          programStringOffset, format, statusPrinter, userFormat )
+
+    def parseStrings( memoryStream, count, dynamicStringsBlockInfo, programStringOffset, format, statusPrinter, userFormat=None ):
+        """
+        Parses count consecutive strings without pad bytes (ex: a string array's data) from the memory stream, reading
+        their structures in one read.  Returns an iterator of the objects returned by parseString(), see it for the
+        parameters.  Each string is decoded as it is iterated, and the structures are only read once iteration starts,
+        so string errors and a read off the end of the block are reported in the same order as parseString().
+        """
+        memoryMap = memoryStream.memoryMap
+        return ( KCBasicUtils.decodeString( memoryMap, length, address + KCBasicRecordReader.KC_TO_MC_OFFSET, \
+                                            dynamicStringsBlockInfo, programStringOffset, format, statusPrinter, userFormat ) \
+                 for ( length, address ) in memoryStream.readStructArray( '<BH', count ) )
+
+    def decodeString( memoryMap, length, address, dynamicStringsBlockInfo, programStringOffset, format, statusPrinter, userFormat ):
+        """
+        Decodes a string from its length and MC address, after its structure has been read by parseString() or
+        parseStrings().  Returns the same object as parseString(), see it for the parameters.
+        """
         if address < KCBasicRecordReader.ADDRESS_START or address > KCBasicRecordReader.ADDRESS_END:
             statusPrinter.errorExit( 1, "String's address of $%04x is out-of-range" % address )
 
-        class Result: pass
-        result = Result()
-        result.value     = ""
-        result.isDynamic = False
-
-        memoryMap = memoryStream.memoryMap
         if memoryMap.checkStateRange( address, length, MCMemoryMap.STATE_WRITTEN, True ) == False:
-            result.value = "Unreadable string of length %d at address $%04x" % ( length, address )
-            return result
+            return KCBasicUtils.StringValue( "Unreadable string of length %d at address $%04x" % ( length, address ), None, False )
 
         # Determine if the string is Program or Dynamic.  If program, then adjust the address location by an offset.
         dynaAddress = None
@@ -628,100 +810,224 @@ class KCBasicUtils:
            dynamicStringsBlockInfo.length != 0:
             dynaAddress = dynamicStringsBlockInfo.address
             dynaLength  = dynamicStringsBlockInfo.length
-        if dynaAddress != None and address >= dynaAddress and address + length <= dynaAddress + dynaLength:
-            result.isDynamic = True
-        else:
+        isDynamic = dynaAddress != None and address >= dynaAddress and address + length <= dynaAddress + dynaLength
+        if not isDynamic:
             address += programStringOffset
 
+        value     = KCBasicUtils.formatString( memoryMap, address, length, format, statusPrinter )
+        userValue = None
+        if userFormat != None and format == 'kcbasic' and value.find('CHR$(') >= 0:
+            userValue = KCBasicUtils.formatString( memoryMap, address, length, userFormat, statusPrinter )
+        return KCBasicUtils.StringValue( value, userValue, isDynamic )
+
+    def formatString( memoryMap, address, length, format, statusPrinter ):
+        """
+        Decodes the string of the given length at address in the memory map, and returns it in the given format.
+        See parseString() documentation for details on format.
+        """
+        data = memoryMap.readLowBytes( address, length )
         if format == 'kcbasic':
-            # KC BASIC program format
-            hasStartQuote = False
-            for i in range( address, address + length ):
-                character = memoryMap.readLowByte( i )
-                if character >= 0x20 and character <= 0x7E and character != 0x22 and character != 0x5E and character != 0x60:
-                    # Can't directly print the " character, the ↑ character, or the ¢ character (respectively)
-                    if hasStartQuote == False:
-                        if len( result.value ) > 0:
-                            result.value += '+'
-                        result.value += '"'
-                        hasStartQuote = True
-                    result.value += chr( memoryMap.readLowByte( i ) )
-                else:
-                    if hasStartQuote == True:
-                        result.value += '"'
-                        hasStartQuote = False
-                    if len( result.value ) > 0:
-                        result.value += '+'
-                    result.value += 'CHR$(%d)' % character
-            if len(result.value) == 0:
-                result.value = '""'
-            elif hasStartQuote == True:
-                result.value += '"'
-        else:
-            # A user display format
-            i = address
-            while i < address+length:
-                character = memoryMap.readLowByte( i )
-                escGroup  = None
-                escChar   = None
-                if character == 27 and i+2 < address+length:
-                    escGroup = memoryMap.readLowByte( i + 1 )
-                    escChar  = memoryMap.readLowByte( i + 2 )
-                    i += 2
-
-                result.value += KCBasicUtils.parseCharacter( character, escGroup, escChar, format, statusPrinter )
-                i += 1
+            return KCBasicUtils.formatKCBasicString( data )
+        return KCBasicUtils.formatDisplayString( data, format, statusPrinter )
+
+    # Splits a string into runs of characters that can be printed between "", and single other characters.
+    # Can't directly print the " character, the ↑ character, or the ¢ character (respectively)
+    kcBasicStringParts = re.compile( r'([\x20\x21\x23-\x5D\x5F\x61-\x7E]+)|(.)', re.DOTALL )
+    # The same characters, as the bytes to delete when checking whether a whole string can go between ""
+    kcBasicQuotable    = bytes( c for c in range( 0x20, 0x7F ) if c != 0x22 and c != 0x5E and c != 0x60 )
+
+    def formatKCBasicString( data ):
+        """
+        Returns the string's bytes in KC BASIC program format.  See parseString() documentation for details.
+        """
+        if len( data.translate( None, KCBasicUtils.kcBasicQuotable ) ) == 0:
+            # Most strings are plain text (or empty), which only needs quoting
+            return '"' + data.decode( 'latin-1' ) + '"'
+        parts = [ '"' + quoted + '"' if quoted else 'CHR$(%d)' % ord( character ) \
+                  for quoted, character in KCBasicUtils.kcBasicStringParts.findall( data.decode( 'latin-1' ) ) ]
+        return '+'.join( parts )
+
+    # Per format, the decoding of every 1-byte character.  Filled in the first time each format is used.
+    displayCharacterLuts = {}
+    # Per format, the decoding of each 3-byte escape sequence seen so far, keyed by ( escGroup << 8 ) | escChar
+    displayEscapeCaches  = {}
+
+    def formatDisplayString( data, format, statusPrinter ):
+        """
+        Returns the string's bytes in the given user display format.  See parseString() documentation for details.
+        """
+        characters = KCBasicUtils.displayCharacterLuts.get( format )
+        if characters == None and len( data ) > 0:
+            characters = [ KCBasicUtils.parseCharacter( character, None, None, format, statusPrinter ) for character in range( 0, 256 ) ]
+            KCBasicUtils.displayCharacterLuts[format] = characters
+        escapes = KCBasicUtils.displayEscapeCaches.setdefault( format, {} )
+        # Decode the bytes once (each byte becomes the character with the same ordinal) so that the runs between
+        # escape sequences can be sliced and translated directly.  The loop's methods are bound once up front.
+        text      = data.decode( 'latin-1' )
+        parts     = []
+        append    = parts.append
+        find      = text.find
+        getEscape = escapes.get
+        length    = len( text )
+        i = 0
+        while i < length:
+            escIndex = find( '\x1b', i )
+            if escIndex < 0 or escIndex+2 >= length:
+                # There are no complete escape sequences left, so the rest is translated at once
+                append( text[i:].translate( characters ) )
+                break
+            if escIndex > i:
+                # The characters up to the escape sequence are translated at once
+                append( text[i:escIndex].translate( characters ) )
+            # Strings tend to repeat the same few escape sequences, so each one is only decoded once
+            escKey  = ( data[escIndex+1] << 8 ) | data[escIndex+2]
+            snippet = getEscape( escKey )
+            if snippet == None:
+                snippet = KCBasicUtils.parseCharacter( 27, data[escIndex+1], data[escIndex+2], format, statusPrinter )
+                escapes[escKey] = snippet
+            append( snippet )
+            i = escIndex + 3
                 
-            # Get rid of any excessive ^^
-            result.value = result.value.replace( '^^', '^' )
-        return result
+        # Get rid of any excessive ^^
+        return ''.join( parts ).replace( '^^', '^' )
+
+    # The raw Intellivision logo.  0 is followed by a horizontal position, 0A is a line feed, 41-5A are letters and
+    # 80-BF are block characters.
+    rawIntellivisionLogo = bytes.fromhex( '00 02 BF 00 08 A0 00 17 96 0A 00 02 BF A8 BD 80' + \
+                                          '95 AE BF 84 BE 83 AA 95 80 BF 80 8A 85 BF 90 80' + \
+                                          'BA 8A 85 BE 9F 83 81 8F A8 9F AF 94 BE 94 AA 54' + \
+                                          '4D 0A 00 02 BF AA 8B BD 95 AA BF 80 BF 83 AA 95' + \
+                                          '80 BF 80 AA 95 AB B5 A8 95 AA 95 8B AF BD 90 BF' + \
+                                          'AA 80 80 95 97 AF BE 0A 00 02 BF AA 80 AB 95 8A' + \
+                                          'BF 90 AF BC 8A BD 94 AF BC AA 95 80 AF 9F 80 AA' + \
+                                          '95 BC BC BE 85 BF 8A BD BE 85 95 82 BF 0A 0A 0A' + \
+                                          '00 10 95 B4 A8 88 9C A8 8C A8 80 94 A8 A8 8C A8' + \
+                                          '8C A8 90 94 AC 84 0A 00 10 95 97 AF 80 95 AA B1' + \
+                                          'AA 90 B5 AA AA BA AA B1 AA 8B 95 AA 0A 0A 00 11' + \
+                                          '82 97 A8 8C A8 80 9C 84 94 94 94 9C 84 94 9C 94' + \
+                                          'B4 A8 0A 00 12 95 AA B1 AA 90 B7 90 A5 85 95 B3' + \
+                                          '95 95 B5 95 97 AF' )
+    # The logo only depends on the format, so each format's logo is only built once
+    intellivisionLogos = {}
 
     def buildIntellivisionLogo( format, statusPrinter ):
         """
         Returns the string for the Intellivision logo, based on the given format.
         """
+        result = KCBasicUtils.intellivisionLogos.get( format )
+        if result != None:
+            return result
+
         # Parse the raw logo based off of the format.
-        result  = ''
-        rawLogo = bytes.fromhex( '00 02 BF 00 08 A0 00 17 96 0A 00 02 BF A8 BD 80' + \
-                                 '95 AE BF 84 BE 83 AA 95 80 BF 80 8A 85 BF 90 80' + \
-                                 'BA 8A 85 BE 9F 83 81 8F A8 9F AF 94 BE 94 AA 54' + \
-                                 '4D 0A 00 02 BF AA 8B BD 95 AA BF 80 BF 83 AA 95' + \
-                                 '80 BF 80 AA 95 AB B5 A8 95 AA 95 8B AF BD 90 BF' + \
-                                 'AA 80 80 95 97 AF BE 0A 00 02 BF AA 80 AB 95 8A' + \
-                                 'BF 90 AF BC 8A BD 94 AF BC AA 95 80 AF 9F 80 AA' + \
-                                 '95 BC BC BE 85 BF 8A BD BE 85 95 82 BF 0A 0A 0A' + \
-                                 '00 10 95 B4 A8 88 9C A8 8C A8 80 94 A8 A8 8C A8' + \
-                                 '8C A8 90 94 AC 84 0A 00 10 95 97 AF 80 95 AA B1' + \
-                                 'AA 90 B5 AA AA BA AA B1 AA 8B 95 AA 0A 0A 00 11' + \
-                                 '82 97 A8 8C A8 80 9C 84 94 94 94 9C 84 94 9C 94' + \
-                                 'B4 A8 0A 00 12 95 AA B1 AA 90 B7 90 A5 85 95 B3' + \
-                                 '95 95 B5 95 97 AF' )
+        parts   = []
+        rawLogo = KCBasicUtils.rawIntellivisionLogo
 
         i = 0
         while i < len( rawLogo ):
             character = rawLogo[i]
             if character == 0:
-                result += KCBasicUtils.HPOS % rawLogo[i+1]
+                parts.append( KCBasicUtils.HPOS % rawLogo[i+1] )
                 i += 1
             elif character == 0x0a:
-                result += KCBasicUtils.controlCharsDict[character]
+                parts.append( KCBasicUtils.controlChars[character] )
             elif character >= 0x41 and character <= 0x5a:
-                result += chr(character)
+                parts.append( chr(character) )
             elif character >= 0x80 and character <= 0xBF:
                 blockChar = None
-                if format in KCBasicUtils.formatDicts and character in KCBasicUtils.formatDicts[format]:
-                    blockChar = KCBasicUtils.formatDicts[format][character]
+                if format in KCBasicUtils.formatLuts:
+                    blockChar = KCBasicUtils.formatLuts[format][character]
                 if blockChar == None:
                     blockChar = '^%d^' % character
-                else:
-                    blockChar = chr(blockChar)
-                result += blockChar
+                parts.append( blockChar )
             else:
                 statusPrinter.errorExit( 2, 'Illegal character $%02x found in rawLogo string' % character )
             i += 1
         
+        result = ''.join( parts )
+        KCBasicUtils.intellivisionLogos[format] = result
         return result
         
+    # Escape groups that decode escChar as a number: the legal escChar range and the format for escChar - 64
+    escapeNumberFormats = { 20: ( 65, 103, HPOS                    ),
+                            21: ( 65,  88, '^VPOS_CURSOR(%d)^'     ),
+                            22: ( 64, 102, '^LMARGIN(%d)^'         ),
+                            23: ( 65, 103, '^RMARGIN(%d)^'         ),
+                            24: ( 65,  88, '^TMARGIN(%d)^'         ),
+                            25: ( 65,  88, '^BMARGIN(%d)^'         ),
+                            27: ( 64, 127, '^REPEAT_DELAY(%d)^'    ) }
+
+    def decodeEscapeNumber( escGroup, escChar, format, statusPrinter ):
+        """
+        Decodes an escape sequence from escapeNumberFormats.  Returns None if escChar is out of range.
+        """
+        low, high, snippetFormat = KCBasicUtils.escapeNumberFormats[escGroup]
+        if escChar >= low and escChar <= high:
+            return snippetFormat % ( escChar - 64 )
+        return None
+
+    def decodeBlinkRate( escGroup, escChar, format, statusPrinter ):
+        """
+        Decodes a cursor blink rate escape sequence.  Returns None if escChar is out of range.
+        """
+        if escChar < 64 or escChar > 128:
+            return None
+        if escChar == 64 or escChar == 128:
+            rate = 'SOLID_ON'
+        elif escChar == 127:
+            rate = 'SOLID_OFF'
+        else:
+            rate = '%d' % ( escChar - 64 )
+        return '^BLINK_RATE(%s)^' % rate
+
+    def decodeHardcodedString( escGroup, escChar, format, statusPrinter ):
+        """
+        Decodes a hardcoded string escape sequence in lower case (28), Pascal case (29) or UPPER case (30).
+        Returns None if escChar is out of range.
+        """
+        if escChar < 65 or escChar > 102:
+            return None
+        if escGroup == 30:
+            # The upper case strings were filled in when the table was built
+            resultSnippet = KCBasicUtils.hardcodedStrings[escChar-64][1]
+        else:
+            resultSnippet = KCBasicUtils.hardcodedStrings[escChar-64][0]
+            if resultSnippet != None and escGroup == 29:
+                # Capitalize the first letter
+                firstLetter = resultSnippet[:1]
+                if firstLetter.islower():
+                    resultSnippet = firstLetter.upper() + resultSnippet[1:]
+        if resultSnippet == None:
+            resultSnippet = KCBasicUtils.buildIntellivisionLogo( format, statusPrinter )
+        return resultSnippet
+
+    def decodeFlag( escGroup, escChar, format, statusPrinter ):
+        """
+        Decodes a misc flag escape sequence.  Returns None if escChar is out of range or not a known flag.
+        """
+        if escChar < 65 or escChar > 127:
+            return None
+        # In theory, it is possible that _some_ flags can be combined but
+        # this decoding is not supported here since it is not documented.
+        return KCBasicUtils.flagSnippets.get( escChar & 0x3F )
+
+    # Decoders for the escape groups other than the KC display characters (16-19), by escGroup
+    escapeGroupDecoders = { 20: decodeEscapeNumber,
+                            21: decodeEscapeNumber,
+                            22: decodeEscapeNumber,
+                            23: decodeEscapeNumber,
+                            24: decodeEscapeNumber,
+                            25: decodeEscapeNumber,
+                            26: decodeBlinkRate,
+                            27: decodeEscapeNumber,
+                            28: decodeHardcodedString,
+                            29: decodeHardcodedString,
+                            30: decodeHardcodedString,
+                            31: decodeFlag }
+
+    # The 6-bit BOX and BRAILLE dot patterns in hex, and as bits from the least significant bit first
+    dotPatternHex  = tuple( '%02X' % pattern for pattern in range(0, 64) )
+    dotPatternBits = tuple( bin( pattern ).lstrip('0b').rjust(6, '0')[::-1] for pattern in range(0, 64) )
+
     def parseCharacter( character, escGroup, escChar, format, statusPrinter ):
         """
         Decodes a character (1-byte or 3-byte format).
@@ -732,82 +1038,41 @@ class KCBasicUtils:
                               See parseString() documentation for details
             statusPrinter   - KCStatusPrinter for logging and errors
         """
+        if escGroup == None and character >= 0x20 and character != 0x7F:
+            # Fast path for the common case of a plain character that is not a control character
+            resultSnippet = KCBasicUtils.formatLuts[format][character]
+            return resultSnippet if resultSnippet != None else '^%d^' % character
+
         resultSnippet = None
         kcDispChar    = None    # If not None, a character that the KC can display using its char-set.
         if ( character < 0x20 or character == 0x7F ) and ( escGroup == None or escChar == None ):
             # Handle control characters or the ` (grave) character
-            if character in KCBasicUtils.controlCharsDict:
-                resultSnippet = KCBasicUtils.controlCharsDict[character]
+            resultSnippet = KCBasicUtils.controlChars[character]
         elif character != 27:
             kcDispChar = character
         elif escGroup != None and escChar != None:
             # The main escape sequence decoding block
-            if escGroup >= 16 and escGroup <= 19 and escChar >= 3 and escChar <= 255:
-                # Through experimentation, escChar == escChar MOD 64 except when 0, 1, and maybe 2
-                # Mattel sometimes took advantage of this trick so it will be handled here.
-                kcDispChar = ( ( escGroup & 0x03 ) << 6 ) | ( escChar & 0x3F )
-            if escGroup == 20 and escChar >= 65 and escChar <= 103:
-                resultSnippet = HPOS % ( escChar - 64 )
-            if escGroup == 21 and escChar >= 65 and escChar <= 88:
-                resultSnippet = '^VPOS_CURSOR(%d)^' % ( escChar - 64 )
-            if escGroup == 22 and escChar >= 64 and escChar <= 102:
-                resultSnippet = '^LMARGIN(%d)^' % ( escChar - 64 )
-            if escGroup == 23 and escChar >= 65 and escChar <= 103:
-                resultSnippet = '^RMARGIN(%d)^' % ( escChar - 64 )
-            if escGroup == 24 and escChar >= 65 and escChar <= 88:
-                resultSnippet = '^TMARGIN(%d)^' % ( escChar - 64 )
-            if escGroup == 25 and escChar >= 65 and escChar <= 88:
-                resultSnippet = '^BMARGIN(%d)^' % ( escChar - 64 )
-            if escGroup == 26 and escChar >= 64 and escChar <= 128:
-                if escChar == 64 or escChar == 128:
-                    resultSnippet = 'SOLID_ON'
-                elif escChar == 127:
-                    resultSnippet = 'SOLID_OFF'
-                else:
-                    resultSnippet = '%d' % ( escChar - 64 )
-                resultSnippet = '^BLINK_RATE(%s)^' % resultSnippet
-            if escGroup == 27 and escChar >= 64 and escChar <= 127:
-                resultSnippet = '^REPEAT_DELAY(%d)^' % ( escChar - 64 )
-            if escGroup >= 28 and escGroup <= 29 and escChar >= 65 and escChar <= 102:
-                resultSnippet = KCBasicUtils.hardcodedStrings[escChar-64][0]
-                if resultSnippet != None:
-                    if escGroup == 29:
-                        # Capitalize the first letter
-                        firstLetter = resultSnippet[:1]
-                        if firstLetter.islower():
-                            resultSnippet = firstLetter.upper() + resultSnippet[1:]
-                if resultSnippet == None:
-                    resultSnippet = KCBasicUtils.buildIntellivisionLogo( format, statusPrinter )
-            if escGroup == 30 and escChar >= 65 and escChar <= 102:
-                if escGroup == 30:
-                    resultSnippet = KCBasicUtils.hardcodedStrings[escChar-64][1]
-                if resultSnippet == None:
-                    resultSnippet = KCBasicUtils.hardcodedStrings[escChar-64][0]
-                    if resultSnippet != None:
-                        # Make upper case
-                        resultSnippet = resultSnippet.upper()
-                    else:
-                        resultSnippet = KCBasicUtils.buildIntellivisionLogo( format, statusPrinter )
-            if escGroup == 31 and escChar >= 65 and escChar <= 127:
-                flagValue   = escChar & 0x2F
-                onOffString = 'OFF' if ( escChar & 0x10 ) == 0 else 'ON'
-                # In theory, it is possible that _some_ flags can be combined but
-                # this decoding is not supported here since it is not documented.
-                if flagValue in KCBasicUtils.flagNames:
-                    resultSnippet = KCBasicUtils.flagNames[flagValue]
-                if resultSnippet != None:
-                    resultSnippet = '^%s_%s^' % ( resultSnippet, onOffString )
+            if escGroup >= 16 and escGroup <= 19:
+                if escChar >= 3 and escChar <= 255:
+                    # Through experimentation, escChar == escChar MOD 64 except when 0, 1, and maybe 2
+                    # Mattel sometimes took advantage of this trick so it will be handled here.
+                    kcDispChar = ( ( escGroup & 0x03 ) << 6 ) | ( escChar & 0x3F )
+            else:
+                decoder = KCBasicUtils.escapeGroupDecoders.get( escGroup )
+                if decoder != None:
+                    resultSnippet = decoder( escGroup, escChar, format, statusPrinter )
 
         # If its a KC character, attempt to decode it.
         if kcDispChar != None:
-            if kcDispChar in KCBasicUtils.formatDicts[format]:
-                resultSnippet = chr( KCBasicUtils.formatDicts[format][kcDispChar] )
+            displayChar = KCBasicUtils.formatLuts[format][kcDispChar]
+            if displayChar != None:
+                resultSnippet = displayChar
             elif escGroup == 18:
-                resultSnippet = '^BOX_%02X_%s^' % ( escChar & 0x3F, \
-                                                    bin( escChar & 0x3F ).lstrip('0b').rjust(6, '0')[::-1] )
+                resultSnippet = '^BOX_%s_%s^' % ( KCBasicUtils.dotPatternHex[escChar & 0x3F], \
+                                                  KCBasicUtils.dotPatternBits[escChar & 0x3F] )
             elif escGroup == 19:
-                resultSnippet = '^BRAILLE_%02X_%s^' % ( escChar & 0x3F, \
-                                                        bin( escChar & 0x3F ).lstrip('0b').rjust(6, '0')[::-1] )
+                resultSnippet = '^BRAILLE_%s_%s^' % ( KCBasicUtils.dotPatternHex[escChar & 0x3F], \
+                                                      KCBasicUtils.dotPatternBits[escChar & 0x3F] )
         
         # If resultSnippet was not handled, then just print out the raw numbers in decimal
         if resultSnippet == None:
@@ -831,6 +1096,10 @@ class BinCfgFilePair:
     __KEY_MAPPING      = 'mapping'
     __KEY_NONE         = None      # Special case key for lines that PRECEDE the first section
 
+    # CFG line parsers, applied to lines with their comment and surrounding whitespace removed
+    reSectionName      = re.compile(r"\[([^\]]*)\]")
+    reMappingLine      = re.compile(r"\$([0-9A-Fa-f]{1,4})\s*-\s*\$([0-9A-Fa-f]{1,4})\s*=\s*\$([0-9A-Fa-f]{1,4})\s*(.*)")
+
     def __init__(self, fileNamesBase, memoryMap, canOverwriteFiles, statusPrinter ):
         """
         Initializer
@@ -844,7 +1113,7 @@ class BinCfgFilePair:
         self.fileNameCfg        = self.getBaseFilename( fileNamesBase ) + self.__SUFFIX_CFG
         self.canOverwriteFiles  = canOverwriteFiles
         self.binData            = None
-        self.cfgSections        = {}    # keys are section strings, values are lists of lines
+        self.cfgSections        = collections.defaultdict( list )   # keys are section strings, values are lists of lines
         self.doAddCommandLine   = True
         self._printer           = statusPrinter
         self.queuedComments     = []
@@ -879,8 +1148,6 @@ class BinCfgFilePair:
         if not os.path.isfile(self.fileNameCfg):
             self._printer.errorExit( 2, 'File "' + self.fileNameCfg + '" is not a readable file.' )
         cfgFile = open( self.fileNameCfg, 'r' )
-        cfgData = cfgFile.read()
-        cfgFile.close()
         
         #
         # Parse the CFG file (at least partially)
@@ -892,28 +1159,24 @@ class BinCfgFilePair:
         #     All other sections are just plain lines of text.
         # 3.  Corner case: blank and comment lines that appear before the 1st section are associated with that section.
         #
-        reSectionName       = re.compile(r"\[([^\]]*)\]")
-        reMappingLine       = re.compile(r"\$([0-9A-Fa-f]{1,4})\s*-\s*\$([0-9A-Fa-f]{1,4})\s*=\s*\$([0-9A-Fa-f]{1,4})\s*(.*)")
         sectionCurrent      = self.__KEY_NONE
-        cfgLines = cfgData.splitlines(False)
-        for i in range(0, len(cfgLines)):
-            cfgLine         = cfgLines[i]
-            appendLine      = False
-            hasComment      = self.lineHasComment( cfgLine )
+        sectionLines        = None      # The lines of sectionCurrent, once it has any
+        for cfgLine in cfgFile:
+            cfgLine         = cfgLine.rstrip( '\n' )
             cfgLineTrimmed  = self.trimCommentAndWhitespace( cfgLine )
             isEmpty         = len( cfgLineTrimmed ) == 0
-            onlyComment     = hasComment and isEmpty
             
-            # Core parsing block
-            reSectionMatch = reSectionName.fullmatch( cfgLineTrimmed )
+            # Core parsing block.  Only lines starting with '[' can be section headers.
+            reSectionMatch = None
+            if cfgLineTrimmed.startswith( '[' ):
+                reSectionMatch = self.reSectionName.fullmatch( cfgLineTrimmed )
             if reSectionMatch != None:
                 # Handler for parsing a section header (ex: [vars] or [mapping])
                 sectionCurrent = reSectionMatch.group(1)
-                if sectionCurrent not in self.cfgSections:
-                    self.cfgSections[sectionCurrent] = []
+                sectionLines   = self.cfgSections[sectionCurrent]
             elif not isEmpty and sectionCurrent == self.__KEY_MAPPING:
                 # Handler for lines in the [mapping] section
-                reMappingMatch = reMappingLine.fullmatch( cfgLineTrimmed )
+                reMappingMatch = self.reMappingLine.fullmatch( cfgLineTrimmed )
                 if reMappingMatch == None:
                     self._printer.errorPrint( 'Unrecognized [mapping] line: ' + cfgLine )
                     self._printer.errorExit( 2, 'Unrecognized [mapping] line:\n' + cfgLine )
@@ -925,9 +1188,10 @@ class BinCfgFilePair:
                 startOffset     *= 2    # The 2x converts from WORD index into BYTE index
                 self.memoryMap.writeByteBuffer( startAddress, self.binData, startOffset, lenInBytes, cfgLine )
             else:
-                if sectionCurrent == self.__KEY_NONE and not self.__KEY_NONE in self.cfgSections:
-                    self.cfgSections[sectionCurrent] = []
-                self.cfgSections[sectionCurrent].append( cfgLine )
+                if sectionLines == None:
+                    sectionLines = self.cfgSections[sectionCurrent]
+                sectionLines.append( cfgLine )
+        cfgFile.close()
             
     def writeFiles( self ):
         """
@@ -949,22 +1213,20 @@ class BinCfgFilePair:
         self.addCommandLineComment()
         for i in range( 0, len( self.queuedComments ) ):
             self.cfgSections[self.__KEY_NONE].insert( i+1, '; ' + self.queuedComments[i] ) # The +1 is so queued comments are inserted below the command-line
-        if self.__KEY_MAPPING not in self.cfgSections:
-            self.cfgSections[self.__KEY_MAPPING] = []
+        self.cfgSections.setdefault( self.__KEY_MAPPING, [] )
         sectionKeys = self.cfgSections.keys()
         isLastNoneLineBlank = False
-        if self.__KEY_NONE in sectionKeys:
-            for line in self.cfgSections[self.__KEY_NONE]:
-                cfgFile.write( line + '\n' )
-                isLastNoneLineBlank = ( len( line.strip() ) == 0 )
+        noneLines = self.cfgSections.get( self.__KEY_NONE )
+        if noneLines:
+            cfgFile.writelines( line + '\n' for line in noneLines )
+            isLastNoneLineBlank = ( len( noneLines[-1].strip() ) == 0 )
         if not isLastNoneLineBlank:
             cfgFile.write( '\n' )
         for sectionKey in sectionKeys:
             if sectionKey == self.__KEY_NONE:
                 continue
             cfgFile.write( '[' + sectionKey + ']\n' )
-            for line in self.cfgSections[sectionKey]:
-                cfgFile.write( line + '\n' )
+            cfgFile.writelines( line + '\n' for line in self.cfgSections[sectionKey] )
             if sectionKey == self.__KEY_MAPPING:
                 self.writeMappingSection( binFile, cfgFile )
                     
@@ -980,35 +1242,26 @@ class BinCfgFilePair:
         self.addCommandLineComment()
         otherKeys = otherBinCfg.cfgSections.keys()
         for otherKey in otherKeys:
-            otherLines = otherBinCfg.cfgSections[otherKey].copy()
-            if otherKey in self.cfgSections:
-                self.cfgSections[otherKey] += otherLines
-            else:
-                self.cfgSections[otherKey] = otherLines
+            self.cfgSections[otherKey] += otherBinCfg.cfgSections[otherKey]
         #self.debugPrint()
         
     def writeMappingSection( self, binFile, cfgFile ):
         """
         Writes the section called 'mapping' to both the BIN file and CFG file
         """
-        startAddress = None
         startOffset  = 0
-        nextOffset   = 0
-        for address in range( 0, self.memoryMap.SIZE ):
-            isWritten = ( self.memoryMap.getWordState( address ) == self.memoryMap.STATE_WRITTEN )
-            if isWritten:
-                if startAddress == None:
-                    startAddress = address
-                nextOffset += 1
-                binFile.write( self.memoryMap.readWord( address ).to_bytes( 2, byteorder="big", signed=False ) )
+        mappingLines = []
+        for startAddress, endAddress in self.memoryMap.getWrittenRanges():
+            # Each range of written words goes to the BIN file in one big-endian block
+            binFile.write( self.memoryMap.readWordsBE( startAddress, endAddress - startAddress ) )
+            nextOffset = startOffset + endAddress - startAddress
+            if endAddress < self.memoryMap.SIZE:
+                mappingLines.append( '$%04x - $%04x = $%04x\n' % ( startOffset, nextOffset-1, startAddress ) )
             else:
-                if startAddress != None:
-                    cfgFile.write( '$%04x - $%04x = $%04x\n' % ( startOffset, nextOffset-1, startAddress ) )
-                    startOffset  = nextOffset
-                    startAddress = None
-        # Handle the case where data was written all the way up to $FFFF
-        if startAddress != None:
-            cfgFile.write( '$%04x - $%04x = $%04x\n' % ( startOffset, self.memoryMap.SIZE-1, startAddress ) )
+                # Handle the case where data was written all the way up to $FFFF
+                mappingLines.append( '$%04x - $%04x = $%04x\n' % ( startOffset, self.memoryMap.SIZE-1, startAddress ) )
+            startOffset = nextOffset
+        cfgFile.write( ''.join( mappingLines ) )
 
     def addCommandLineComment( self ):
         """
@@ -1018,13 +1271,7 @@ class BinCfgFilePair:
         if self.doAddCommandLine == False:
             return
         self.doAddCommandLine = False
-        commandLine = ";"
-        for arg in sys.argv:
-            if arg.find( " " ) >= 0:
-                arg = '"' + arg + '"'
-            commandLine += " " + arg
-        if self.__KEY_NONE not in self.cfgSections:
-            self.cfgSections[self.__KEY_NONE] = []
+        commandLine = ' '.join( [ ";" ] + [ '"' + arg + '"' if arg.find( " " ) >= 0 else arg for arg in sys.argv ] )
         self.cfgSections[self.__KEY_NONE].insert( 0, commandLine )
 
     def queueCommentsForWrite( self, linesOfText ):
@@ -1050,7 +1297,7 @@ class BinCfgFilePair:
         """
         Returns what is left after removing any comments and then removing any leading and trailing whitespace 
         """
-        return lineText.split(';')[0].strip()
+        return lineText.split(';', 1)[0].strip()
     
     def debugPrint(self):
         """
@@ -1075,6 +1322,9 @@ class KCRecords:
     Manager class for record files
     """
 
+    PREFETCH_DEPTH  = 2     # Number of record files ahead of the current one that the OS is asked to read in
+    PREFETCH_AFTER  = 2     # Number of record files read before prefetching starts
+
     def __init__(self, fileNamesPattern, startIndex, endIndex, statusPrinter ):
         """
         Initializer
@@ -1096,6 +1346,7 @@ class KCRecords:
         self.startIndex     = startIndex
         self.endIndex       = endIndex
         self.currentIndex   = -1
+        self.recordsRead    = 0
         self._printer       = statusPrinter
 
         percentDoubleCount  = self.fileNamesPattern.count('%%')
@@ -1127,14 +1378,47 @@ class KCRecords:
             fileName = self.fileNamesPattern
             self.currentIndex = 0
            
-        self._printer.printStatus( 0, 'Opening "%s" ...' % fileName )
-        if not os.path.isfile(fileName):
+        self._printer.printStatus( 0, 'Opening "%s" ...', fileName )
+        # Opening the file directly also covers missing files and directories, without a separate check first.
+        # The whole file is read at once, so there is no need for Python's buffering.
+        try:
+            with open( fileName, 'rb', buffering=0 ) as fileObj:
+                data = fileObj.read()
+        except OSError:
             self._printer.errorExit( 2, 'File "' + fileName + '" is not a readable file.' )
-        
-        fileObj = open( fileName, 'rb' )
-        binData = fileObj.read()
-        fileObj.close()
-        return binData
+        self.recordsRead += 1
+        self.prefetchRecords()
+        return data
+
+    def prefetchRecords(self):
+        """
+        Hints to the OS that the next PREFETCH_DEPTH record files will be read soon, so they can be read in while the
+        current one is parsed.  Only starts once PREFETCH_AFTER records have been read, since short runs gain nothing.
+        Does nothing where the hint is not supported.
+        """
+        if self.percentCount != 1 or self.recordsRead < self.PREFETCH_AFTER or not hasattr( os, 'posix_fadvise' ):
+            return
+        # The files closer than PREFETCH_DEPTH were already hinted, except when prefetching first starts
+        firstIndex = self.currentIndex + 1 if self.recordsRead == self.PREFETCH_AFTER else self.currentIndex + self.PREFETCH_DEPTH
+        for index in range( firstIndex, self.currentIndex + self.PREFETCH_DEPTH + 1 ):
+            if self.endIndex != -1 and index > self.endIndex:
+                return
+            self.prefetchRecord( self.fileNamesPattern % index )
+
+    def prefetchRecord(self, fileName):
+        """
+        Hints to the OS that the record file will be read soon.  Does nothing if the file can't be opened.
+        """
+        try:
+            fileDescriptor = os.open( fileName, os.O_RDONLY )
+        except OSError:
+            return
+        try:
+            os.posix_fadvise( fileDescriptor, 0, 0, os.POSIX_FADV_WILLNEED )
+        except OSError:
+            pass
+        finally:
+            os.close( fileDescriptor )
 
 
 
@@ -1143,6 +1427,7 @@ class KCAbstractRecordReader:
     Abstract class that reads and parses KC's records
     Derived classes must implement:
         def readRawByte(self):      # Returns the next RAW byte from a record file or None if the end has been reached
+        def rawDataEnd(self):       # Returns the index where the raw data that can be read from the current record ends
     """
 
     _CHUNK_BYTES    = 0x40
@@ -1150,6 +1435,8 @@ class KCAbstractRecordReader:
     _KC_ADDRESS_END = 0x3fff
     ADDRESS_START   = KC_TO_MC_OFFSET
     ADDRESS_END     = KC_TO_MC_OFFSET + _KC_ADDRESS_END
+    _LEGAL_UPPER_BYTES = bytes( range( 0, 4 ) )  # Upper bytes of words whose low bytes are read, i.e. only the decle's top 2 bits
+    _DUMP_TEXT      = bytes( c if c >= 0x20 and c <= 0x7E else 0x2E for c in range( 0, 256 ) )    # Non-printable bytes dump as '.'
 
     def __init__(self, memoryMap, fileNamesPattern, startIndex, endIndex, statusPrinter ):
         """
@@ -1170,16 +1457,54 @@ class KCAbstractRecordReader:
         self._binIndex                  = 0
         # Size and offset variables and constants
 
+    def skipRawBytes(self, count):
+        """
+        Skips the next count RAW bytes without reading them.  Never skips past the end of the current record's raw data.
+        """
+        self._binIndex = min( self._binIndex + count, self.rawDataEnd() )
+
     def readRawWord(self):
         """
-        Returns the next RAW little-endian word from a record file or None if the end has been reached
+        Returns the next RAW big-endian word from a record file or None if the end has been reached
         """
+        index = self._binIndex
+        if index + 2 <= self.rawDataEnd():
+            # Both bytes are in the current record, so read them directly
+            self._binIndex = index + 2
+            return ( self._binData[index] << 8 ) | self._binData[index + 1]
+        # Let readRawByte() move on to the next record or detect the end
         data1 = self.readRawByte()
         data2 = self.readRawByte()
         if data1 == None or data2 == None:
             return None
         return ( (data1 & 0xff) << 8 ) | ( data2 & 0xff )
 
+    def readRawWords(self, count):
+        """
+        Returns a sequence of the next count RAW big-endian words from a record file.  Words are None if the end has been reached.
+        """
+        index = self._binIndex
+        if index + 2 * count <= self.rawDataEnd():
+            # All the words are in the current record, so unpack them at once
+            self._binIndex = index + 2 * count
+            return struct.unpack_from( '>%dH' % count, self._binData, index )
+        return [ self.readRawWord() for i in range( 0, count ) ]
+
+    def readRawWordsIntoMemoryMap(self, address, wordCount, originalText):
+        """
+        Copies up to wordCount RAW words from the current record into the memory map, all at once.
+        Only the whole words left in the current record are copied.  Returns the number of words copied.
+            address         - Integer address of the first word to write to
+            wordCount       - Integer number of words wanted
+            originalText    - String that describes the data, for error messages
+        """
+        wordCount = min( ( self.rawDataEnd() - self._binIndex ) // 2, wordCount )
+        if wordCount <= 0:
+            return 0
+        self.memoryMap.writeByteBuffer( address, self._binData, self._binIndex, wordCount * 2, originalText )
+        self._binIndex += wordCount * 2
+        return wordCount
+
     def readLowByte(self):
         """
         Returns the low byte from the next word from a record file or None if the end has been reached
@@ -1194,11 +1519,44 @@ class KCAbstractRecordReader:
         Returns the little-endian word from low bytes of the next 2 words from a record file
         or None if the end has been reached
         """
+        index = self._binIndex
+        if index + 4 <= self.rawDataEnd():
+            # Both words are in the current record, so read and check them directly.  Illegal upper
+            # bytes are left to readLowByte() to report.
+            binData = self._binData
+            if ( binData[index] & 0xfc ) == 0 and ( binData[index + 2] & 0xfc ) == 0:
+                self._binIndex = index + 4
+                return ( binData[index + 3] << 8 ) | binData[index + 1]
         data1 = self.readLowByte()
         data2 = self.readLowByte()
         if data1 == None or data2 == None:
             return None
         return ( (data2 & 0xff) << 8 ) | ( data1 & 0xff )
+
+    def tryReadLowBytes(self, count):
+        """
+        Returns the low bytes of the next count words from a record file, as bytes, if they are all in the current record
+        and have legal upper bytes.  Otherwise returns None without advancing, so the caller can read them one at a time.
+        """
+        index = self._binIndex
+        end   = index + 2 * count
+        if end <= self.rawDataEnd():
+            # All the words are in the current record, so check all of their upper bytes at once
+            binData = self._binData
+            if len( binData[index:end:2].translate( None, self._LEGAL_UPPER_BYTES ) ) == 0:
+                self._binIndex = end
+                return binData[index + 1:end:2]
+        return None
+
+    def readLowBytes(self, count):
+        """
+        Returns the low bytes of the next count words from a record file, as bytes
+        """
+        data = self.tryReadLowBytes( count )
+        if data == None:
+            # Illegal upper bytes and the end of the record are left to readLowByte() to report
+            data = bytes( [ self.readLowByte() for i in range( 0, count ) ] )
+        return data
         
     def printAnyData(self, indentLevel, startOffset, lengthBytes):
         """
@@ -1213,28 +1571,22 @@ class KCAbstractRecordReader:
         if startOffset+lengthBytes > len( self._binData ) :
             self._printer.errorExit( 3, "Attempt to read more data than remains.  Requested to read up to index %d when there are only %d bytes" % \
                                         ( startOffset+lengthBytes, len( self._binData )  ) )
+        if not self._printer.doPrintStatus:
+            # Nothing would be printed, so don't build the dump
+            return
 
         lengthChunks = lengthBytes // self._CHUNK_BYTES
         self._printer.printStatus( indentLevel, "Length = $%x (%d) bytes or $%x (%d) chunks." % \
                                                 ( lengthBytes, lengthBytes, lengthChunks, lengthChunks ) )
-        line = None
-        text = None
-        for i in range( startOffset, len( self._binData ) ):
-            if line == None:
-                line = "$%04x :" % i
-                text = "    "
-            line += " %02x" % self._binData[i]
-            # Append a printable ASCII character or a '.'
-            text += chr(self._binData[i]) if self._binData[i] >= 0x20 and self._binData[i] <= 0x7E else '.'                
-            if ( i - startOffset ) % 16 == 15:
-                line += text
-                self._printer.printStatus( indentLevel, line )
-                line = None
-                text = None
-        if line != None:
-            line = line.ljust(55)   # Pad out the string with enough spaces
-            line += text
-            self._printer.printStatus( indentLevel, line )
+        # The hex values and the printable ASCII characters (or '.') of all the bytes are built at once.  Each line
+        # then takes 16 bytes' worth of both: 3 characters per hex value and 1 per ASCII character.
+        dumpData = self._binData[startOffset:]
+        dumpHex  = dumpData.hex( ' ' )
+        dumpText = dumpData.translate( self._DUMP_TEXT ).decode( 'ascii' )
+        # Pad out the hex part of each line with enough spaces.  All the lines are printed together.
+        self._printer.printStatusLines( indentLevel, \
+                                        [ ( "$%04x : " % ( startOffset + i ) + dumpHex[3*i:3*i+47] ).ljust(55) + "    " + dumpText[i:i+16] \
+                                          for i in range( 0, len( dumpData ), 16 ) ] )
 
     def printNextData(self, indentLevel, lengthBytes):
         """
@@ -1267,6 +1619,7 @@ class KCBasicRecordReader(KCAbstractRecordReader):
     BLOCK_TYPE_SCALARS         = 'scalars'
     BLOCK_TYPE_ARRAYS          = 'arrays' 
     BLOCK_TYPE_DYNA_STRINGS    = 'strings'
+    BlockInfo                  = collections.namedtuple( 'BlockInfo', ( 'address', 'length' ) )    # Result of getBlockInfo()
 
     __MAX_PAYLOAD_CHUNKS       = 0x40
     __MAX_PAYLOAD_BYTES        = KCAbstractRecordReader._CHUNK_BYTES * __MAX_PAYLOAD_CHUNKS
@@ -1275,16 +1628,24 @@ class KCBasicRecordReader(KCAbstractRecordReader):
     __HAS_MORE_DATA            = 0xe4
     __TYPE_VARIABLES           = 0x01
     __TYPE_PROGRAM             = 0x02
-    __HEADER_PROGRAM_DECLES    = "headerProgramDecles"
-    __HEADER_SCALARS_DECLES    = "headerScalarsDecles"
-    __HEADER_ARRAYS_DECLES     = "headerArraysDecles" 
-    __HEADER_STRINGS_DECLES    = "headerStringsDecles"
-    __HEADER_STRINGS_ADDRESS   = "headerStringsAddress"
+    __HEADER_PROGRAM_DECLES    = 0         # Indices of the header values, in the order they are in the header
+    __HEADER_SCALARS_DECLES    = 1
+    __HEADER_ARRAYS_DECLES     = 2
+    __HEADER_STRINGS_DECLES    = 3
+    __HEADER_STRINGS_ADDRESS   = 4
+    __HEADER_NAMES             = ( "headerProgramDecles", "headerScalarsDecles", "headerArraysDecles", \
+                                   "headerStringsDecles", "headerStringsAddress" )     # Indexed by the __HEADER_ indices above
+    __HEADER_VALUES            = struct.Struct( '<5H' )    # The __HEADER_NAMES values, as low bytes of little-endian words
     __ADDR_BASIC_PROG_START    = 0x8029    # Start of BASIC program (value $0801)
     __ADDR_SCALARS_START       = 0x802b    # Start of Scalar variables
     __ADDR_ARRAYS_START        = 0x802d    # Start of Array variables
     __ADDR_ARRAYS_END          = 0x802f    # End of Array variables (first byte after array)
     __ADDR_DYNA_STRING_START   = 0x8031    # Start of dynamic string stack
+    # The addresses that hold the start and end of each BLOCK_TYPE_ block.  An end of None means the end of KC memory.
+    __BLOCK_ADDRESSES          = { BLOCK_TYPE_PROGRAM:      ( __ADDR_BASIC_PROG_START,  __ADDR_SCALARS_START ),
+                                   BLOCK_TYPE_SCALARS:      ( __ADDR_SCALARS_START,     __ADDR_ARRAYS_START  ),
+                                   BLOCK_TYPE_ARRAYS:       ( __ADDR_ARRAYS_START,      __ADDR_ARRAYS_END    ),
+                                   BLOCK_TYPE_DYNA_STRINGS: ( __ADDR_DYNA_STRING_START, None                 ) }
     
     def __init__(self, memoryMap, isROData, fileNamesPattern, startIndex, endIndex, statusPrinter ):
         """
@@ -1306,17 +1667,12 @@ class KCBasicRecordReader(KCAbstractRecordReader):
         self.__headerFirstData          = None
         self.__headerMoreData           = None
         self.__headerType               = None
-        # Stores a copy of the first record's header.  Errors if a record is loaded where the values change.  Order matters.
-        self.__firstRecordHeader = {   \
-            self.__HEADER_PROGRAM_DECLES:  None, \
-            self.__HEADER_SCALARS_DECLES:  None, \
-            self.__HEADER_ARRAYS_DECLES:   None, \
-            self.__HEADER_STRINGS_DECLES:  None, \
-            self.__HEADER_STRINGS_ADDRESS: None, \
-        }
-        # Similar to above but is a modified copy of the above since __TYPE_VARIABLES records are
+        # Stores a copy of the first record's header values, in __HEADER_NAMES order.  Errors if a record is loaded where the
+        # values change.  None until the first header is read.
+        self.__firstRecordHeader        = None
+        # Similar to above but is a modified copy of the above, as a list, since __TYPE_VARIABLES records are
         # allowed to be shifted in memory (so that variables start immediately after a program).
-        self.__inMemoryHeaders          = self.__firstRecordHeader.copy()
+        self.__inMemoryHeaders          = [ None ] * len( self.__HEADER_NAMES )
         self.__loggableMessages         = []
 
     def parse(self):
@@ -1347,24 +1703,16 @@ class KCBasicRecordReader(KCAbstractRecordReader):
         """
         Returns info on info on blocks of BASIC-program related memory
             blockType   - String that is one of the BLOCK_TYPE_ constants
-        Return value - An object containing 'address' and 'length', both with integer values.
-        """
-        addressStart = None
-        addressEnd   = None
-        if blockType == KCBasicRecordReader.BLOCK_TYPE_PROGRAM:
-            addressStart = KCBasicRecordReader.safeReadMemoryMapLowBytesAsWord( memoryMap, KCBasicRecordReader.__ADDR_BASIC_PROG_START )
-            addressEnd   = KCBasicRecordReader.safeReadMemoryMapLowBytesAsWord( memoryMap, KCBasicRecordReader.__ADDR_SCALARS_START )
-        elif blockType == KCBasicRecordReader.BLOCK_TYPE_SCALARS:
-            addressStart = KCBasicRecordReader.safeReadMemoryMapLowBytesAsWord( memoryMap, KCBasicRecordReader.__ADDR_SCALARS_START )
-            addressEnd   = KCBasicRecordReader.safeReadMemoryMapLowBytesAsWord( memoryMap, KCBasicRecordReader.__ADDR_ARRAYS_START )
-        elif blockType == KCBasicRecordReader.BLOCK_TYPE_ARRAYS:
-            addressStart = KCBasicRecordReader.safeReadMemoryMapLowBytesAsWord( memoryMap, KCBasicRecordReader.__ADDR_ARRAYS_START)
-            addressEnd   = KCBasicRecordReader.safeReadMemoryMapLowBytesAsWord( memoryMap, KCBasicRecordReader.__ADDR_ARRAYS_END )
-        elif blockType == KCBasicRecordReader.BLOCK_TYPE_DYNA_STRINGS:
-            addressStart = KCBasicRecordReader.safeReadMemoryMapLowBytesAsWord( memoryMap, KCBasicRecordReader.__ADDR_DYNA_STRING_START)
-            addressEnd   = KCAbstractRecordReader._KC_ADDRESS_END + 1
-        else:
+        Return value - A BlockInfo containing 'address' and 'length', both with integer values.
+        """
+        blockAddresses = KCBasicRecordReader.__BLOCK_ADDRESSES.get( blockType )
+        if blockAddresses == None:
             return None
+        addressStart = KCBasicRecordReader.safeReadMemoryMapLowBytesAsWord( memoryMap, blockAddresses[0] )
+        if blockAddresses[1] == None:
+            addressEnd = KCAbstractRecordReader._KC_ADDRESS_END + 1
+        else:
+            addressEnd = KCBasicRecordReader.safeReadMemoryMapLowBytesAsWord( memoryMap, blockAddresses[1] )
             
         if addressStart == None or addressEnd == None or addressStart > addressEnd:
             return None
@@ -1372,19 +1720,14 @@ class KCBasicRecordReader(KCAbstractRecordReader):
         addressStart += KCAbstractRecordReader.KC_TO_MC_OFFSET
         addressEnd   += KCAbstractRecordReader.KC_TO_MC_OFFSET
 
-        class Result: pass
-        result = Result()
-        result.address = addressStart
-        result.length  = addressEnd - addressStart
-        return result
+        return KCBasicRecordReader.BlockInfo( addressStart, addressEnd - addressStart )
 
     def safeReadMemoryMapLowBytesAsWord( memoryMap, address ):
         """
         Reads the low bytes from memoryMap as a word or returns None if the low bytes have not been written to
             address     - Integer value of address
         """
-        if memoryMap.getWordState( address     ) != MCMemoryMap.STATE_WRITTEN or \
-           memoryMap.getWordState( address + 1 ) != MCMemoryMap.STATE_WRITTEN:
+        if not memoryMap.checkStateRange( address, 2, MCMemoryMap.STATE_WRITTEN, True ):
             return None
         return memoryMap.readLowBytesAsWord( address )
     
@@ -1403,16 +1746,24 @@ class KCBasicRecordReader(KCAbstractRecordReader):
         if decleCount == 0:
             # Nothing to copy
             return address
-        self._printer.printStatus( 1, 'Processing %s section ...'  % blockType )
-        for i in range( 0, decleCount ):
-            # Actually copy the data
+        self._printer.printStatus( 1, 'Processing %s section ...', blockType )
+        i = 0
+        while i < decleCount:
+            # Copy the whole words left in the current record's payload at once
+            wordCount = self.readRawWordsIntoMemoryMap( address, decleCount - i, '%s section' % blockType )
+            if wordCount > 0:
+                address += wordCount
+                i       += wordCount
+                continue
+            # Otherwise the word comes from the next record, if there is one
             decle = self.readRawWord()
             if decle == None:
-                self._printer.printStatus( 1, "INFO: Could not read all data for %s section.  Only read $%04x of $%04x decles." % \
-                                              ( blockType, i, decleCount ) )
+                self._printer.printStatus( 1, "INFO: Could not read all data for %s section.  Only read $%04x of $%04x decles.", \
+                                              blockType, i, decleCount )
                 return None
             self.memoryMap.writeWord( address, decle )
             address += 1
+            i       += 1
         return address
         
     def readRawByte(self):
@@ -1432,7 +1783,13 @@ class KCBasicRecordReader(KCAbstractRecordReader):
         data = self._binData[self._binIndex]
         self._binIndex += 1
         return data
-    
+
+    def rawDataEnd(self):
+        """
+        Returns the index where the current record's payload ends (or the current index if there is no payload yet)
+        """
+        return self._binIndex if self.__headerPayloadEnd == None else self.__headerPayloadEnd
+
     def parseHeader(self):
         """
         Parses a header after a new record file has just been opened.
@@ -1451,14 +1808,14 @@ class KCBasicRecordReader(KCAbstractRecordReader):
             self._printer.printStatus( 1, "Processing next header (BASIC values are identical to previous header's) ..." )
         
         
-        self.__headerPayloadEnd = 0xfffffff     # Temp setting this to prevent recursion
-        if self.__HEADER_START > 0:
-            # Just discard the non-BASIC part of the header.
-            for i in range( 0, self.__HEADER_START ):
-                self.readRawByte()
+        # Until the payload length is read, only the header itself can be read.  This keeps the reads below from
+        # moving on to the next record.
+        self.__headerPayloadEnd = self.__HEADER_END
+        # Just discard the non-BASIC part of the header (if any).  The length check above guarantees it is there.
+        self.skipRawBytes( self.__HEADER_START )
                 
         self.__headerPayloadEnd = self.readLowBytesAsWord()
-        self._printer.printStatus( 2, "Record size (chunks)       : %d" % self.__headerPayloadEnd )
+        self._printer.printStatus( 2, "Record size (chunks)       : %d", self.__headerPayloadEnd )
         if self.__headerPayloadEnd > self.__MAX_PAYLOAD_CHUNKS:
             self._printer.errorExit( 3, 'BASIC payload chunk length (%d) exceeds max (%d).' % \
                                         (  self.__headerPayloadEnd, self.__MAX_PAYLOAD_CHUNKS ) )
@@ -1468,14 +1825,13 @@ class KCBasicRecordReader(KCAbstractRecordReader):
                                         (self.__headerPayloadEnd, len( self.binData ) ) )
         
         ZERO_WORD_COUNT = 10
-        for i in range( 0, ZERO_WORD_COUNT ):
-            expectZero = self.readRawWord()
+        for i, expectZero in enumerate( self.readRawWords( ZERO_WORD_COUNT ) ):
             if expectZero != 0:
                 self._printer.printStatus( 2, "WARNING: Expected $0000 for header word %d but got $%04x instead.  " \
-                                              "Please report this to the Intellivision Keyboard Component experts." % ( i+1, expectZero ) )
+                                              "Please report this to the Intellivision Keyboard Component experts.", i+1, expectZero )
         
         headerFirstData = self.readLowByte()
-        self._printer.printStatus( 2, "Record isFirst flags       : $%02x" % headerFirstData )
+        self._printer.printStatus( 2, "Record isFirst flags       : $%02x", headerFirstData )
         if self.__headerFirstData == None:
             if headerFirstData != self.__IS_FIRST_DATA:
                 self._printer.errorExit( 3, 'BASIC first header\'s first-data word was illegal value of $%04x' % headerFirstData )
@@ -1484,7 +1840,7 @@ class KCBasicRecordReader(KCAbstractRecordReader):
         self.__headerFirstData = headerFirstData
         
         headerMoreData = self.readLowByte()
-        self._printer.printStatus( 2, "Record moreData flags      : $%02x" % headerMoreData )
+        self._printer.printStatus( 2, "Record moreData flags      : $%02x", headerMoreData )
         if headerMoreData != self.__HAS_MORE_DATA and headerMoreData != 0x00:
             self._printer.errorExit( 3, 'BASIC header\'s more-data word was illegal value of $%04x' % headerMoreData )
         elif headerMoreData == 0x00 and self.__headerPayloadEnd >= self.__MAX_PAYLOAD_BYTES:
@@ -1514,12 +1870,12 @@ class KCBasicRecordReader(KCAbstractRecordReader):
         It returns whether memory overwriting can be forced
         """
         forceOverwrite = False
-        isFirstHeader  = ( self.__firstRecordHeader[self.__HEADER_PROGRAM_DECLES] == None )
+        isFirstHeader  = ( self.__firstRecordHeader == None )
     
         # Read and check against prior header
         headerType = self.readLowByte()
         if isFirstHeader:
-            self._printer.printStatus( 2, "BASIC type                 : %d" % headerType )
+            self._printer.printStatus( 2, "BASIC type                 : %d", headerType )
         if headerType != self.__TYPE_VARIABLES and headerType != self.__TYPE_PROGRAM:
             self._printer.errorExit( 3, 'BASIC header\'s type word was illegal value of $%04x' % headerType )
         if self.__headerType != None and self.__headerType != headerType:
@@ -1527,40 +1883,50 @@ class KCBasicRecordReader(KCAbstractRecordReader):
         self.__headerType = headerType
 
         OFTEN_ZERO_WORD_COUNT = 7
-        for i in range( 0, OFTEN_ZERO_WORD_COUNT ):
-            expectZero = self.readRawWord()
+        for i, expectZero in enumerate( self.readRawWords( OFTEN_ZERO_WORD_COUNT ) ):
             if expectZero != 0:
                 self._printer.printStatus( 2, "INFO: Expected $0000 for header word %d but got $%04x instead.  " + \
                                               "This sometimes happens and is unexplained at this time." % ( i+0x0F, expectZero ) )
                 
-        for headerName in self.__firstRecordHeader.keys():
-            data = self.readLowBytesAsWord()
+        headerBytes = self.tryReadLowBytes( self.__HEADER_VALUES.size )
+        if headerBytes != None:
+            header = self.__HEADER_VALUES.unpack( headerBytes )
             if isFirstHeader:
-                self._printer.printStatus( 2, "BASIC %-20s : $%04x (%d)" % (headerName, data, data ) )
-            if self.__firstRecordHeader[headerName] != None and data != self.__firstRecordHeader[headerName]:
-                self._printer.errorExit( 3, 'Latest header does not match previous headers.  %s is $%04x but was previously $%04x' % \
-                                            ( headerName, data, self.__firstRecordHeader[headerName]) )
-            self.__firstRecordHeader[headerName] = data
+                for headerName, data in zip( self.__HEADER_NAMES, header ):
+                    self._printer.printStatus( 2, "BASIC %-20s : $%04x (%d)", headerName, data, data )
+            elif header != self.__firstRecordHeader:
+                # Report the first value that changed
+                for headerName, data, firstData in zip( self.__HEADER_NAMES, header, self.__firstRecordHeader ):
+                    if data != firstData:
+                        self._printer.errorExit( 3, 'Latest header does not match previous headers.  %s is $%04x but was previously $%04x' % \
+                                                    ( headerName, data, firstData ) )
+        else:
+            # A word is illegal or past the end of the record.  Read, print and check the values one at a time, so the
+            # values before it are reported before the error.
+            header = []
+            for i, headerName in enumerate( self.__HEADER_NAMES ):
+                data = self.readLowBytesAsWord()
+                if isFirstHeader:
+                    self._printer.printStatus( 2, "BASIC %-20s : $%04x (%d)", headerName, data, data )
+                elif data != self.__firstRecordHeader[i]:
+                    self._printer.errorExit( 3, 'Latest header does not match previous headers.  %s is $%04x but was previously $%04x' % \
+                                                ( headerName, data, self.__firstRecordHeader[i] ) )
+                header.append( data )
+            header = tuple( header )
+        if isFirstHeader:
+            self.__firstRecordHeader = header
             
         # Copy values
-        for headerName in self.__firstRecordHeader.keys():
-            self.__inMemoryHeaders[headerName] = self.__firstRecordHeader[headerName]
+        self.__inMemoryHeaders = list( header )
             
         # Adjust the copy, if necessary
         if self.__headerType == self.__TYPE_VARIABLES:
             # Different programs can load identical records with VLOD.  Need to shift the addresses if a program is already present.
             # RAM dumps show "start of Scalar variables" butts against programs but "Family Budgeting" has two different programs
             # with DIFFERENT lengths that can load the SAME VLOD/VSAV records.
-            if self.memoryMap.getWordState( self.__ADDR_BASIC_PROG_START      ) == self.memoryMap.STATE_WRITTEN and \
-               self.memoryMap.getWordState( self.__ADDR_BASIC_PROG_START + 1  ) == self.memoryMap.STATE_WRITTEN and \
-               self.memoryMap.getWordState( self.__ADDR_SCALARS_START         ) == self.memoryMap.STATE_WRITTEN and \
-               self.memoryMap.getWordState( self.__ADDR_SCALARS_START + 1     ) == self.memoryMap.STATE_WRITTEN and \
-               self.memoryMap.getWordState( self.__ADDR_ARRAYS_START          ) == self.memoryMap.STATE_WRITTEN and \
-               self.memoryMap.getWordState( self.__ADDR_ARRAYS_START + 1      ) == self.memoryMap.STATE_WRITTEN and \
-               self.memoryMap.getWordState( self.__ADDR_ARRAYS_END            ) == self.memoryMap.STATE_WRITTEN and \
-               self.memoryMap.getWordState( self.__ADDR_ARRAYS_END + 1        ) == self.memoryMap.STATE_WRITTEN and \
-               self.memoryMap.getWordState( self.__ADDR_DYNA_STRING_START     ) == self.memoryMap.STATE_WRITTEN and \
-               self.memoryMap.getWordState( self.__ADDR_DYNA_STRING_START + 1 ) == self.memoryMap.STATE_WRITTEN:
+            # The pointers from __ADDR_BASIC_PROG_START to __ADDR_DYNA_STRING_START are contiguous little-endian words
+            pointersLength = self.__ADDR_DYNA_STRING_START + 2 - self.__ADDR_BASIC_PROG_START
+            if self.memoryMap.checkStateRange( self.__ADDR_BASIC_PROG_START, pointersLength, self.memoryMap.STATE_WRITTEN, True ):
                 # Shift the data to align to the pre-existing program.
                 forceOverwrite = True
                 newScalarsStart = self.memoryMap.readLowBytesAsWord( self.__ADDR_SCALARS_START ) - ( self.__BASIC_ADDRESS_START - self.KC_TO_MC_OFFSET )
@@ -1603,6 +1969,7 @@ class KCRODataRecordReader(KCAbstractRecordReader):
     """
 
     _BLOCK_COUNT       = 3
+    _BLOCK_FIELDS      = struct.Struct( '<B4H' )    # A header block's type, pad word, destination address, length and poke address
 
     def __init__(self, memoryMap, fileNamesPattern, startIndex, endIndex, isTruncationOk, statusPrinter, isShortLogging ):
         """
@@ -1647,7 +2014,13 @@ class KCRODataRecordReader(KCAbstractRecordReader):
         data = self._binData[self._binIndex]
         self._binIndex += 1
         return data
-    
+
+    def rawDataEnd(self):
+        """
+        Returns the index where the current record ends
+        """
+        return len( self._binData )
+
     def parseHeader(self):
         """
         Parses a header after a new record file has just been opened.
@@ -1680,25 +2053,21 @@ class KCRODataRecordReader(KCAbstractRecordReader):
 
         # Check the checksum
         
-        checksummedBytes = self._binData[:self._CHUNK_BYTES]
-        checksum = 0
-        for i in range( 1, self._CHUNK_BYTES, 2 ):
-            checksum += self._binData[i]
-        checksum &= 0xff
+        checksum = sum( memoryview( self._binData )[1:self._CHUNK_BYTES:2] ) & 0xff
         if checksum != 0:
             self._printer.errorExit( 4, "Header's checksum was $%02x instead of $00 (only odd bytes are summed)" % checksum )
 
         # Parse general header fields
         
         recordNum = self.readLowBytesAsWord()
-        self._printer.printStatus( 1, "Record number        : %d" % recordNum )
+        self._printer.printStatus( 1, "Record number        : %d", recordNum )
         if self.recordNum != None and recordNum != self.recordNum + 1:
             self._printer.errorExit( 4, "Non-sequential record number.  Read %d but next was expected to be %d" % \
                                         (recordNum, self.recordNum + 1 ) )
         self.recordNum = recordNum
         
         self.recordChunks  = self.readLowBytesAsWord()
-        self._printer.printStatus( 1, "Record chunks        : $%04x (%d)" % (self.recordChunks, self.recordChunks) )
+        self._printer.printStatus( 1, "Record chunks        : $%04x (%d)", self.recordChunks, self.recordChunks )
         if self.recordChunks * self._CHUNK_BYTES > len( self._binData ):
             message = "Header's chunk length field ($%04x) indicates %d decles long but the file was only %d bytes long" % \
                       ( self.recordChunks, self.recordChunks * self._CHUNK_BYTES, len( self._binData ) )
@@ -1710,13 +2079,15 @@ class KCRODataRecordReader(KCAbstractRecordReader):
         # Parse the 3 header blocks
         self._blocks = []
         for i in range(0, self._BLOCK_COUNT):
+            # Each block is a byte then 4 little-endian words, all in low bytes
+            type, padWord, destAddress, lengthChunks, pokeAddress = self._BLOCK_FIELDS.unpack( self.readLowBytes( self._BLOCK_FIELDS.size ) )
             self._blocks.append( KCRODataRecordReader.KCHeaderBlock( self._printer, \
                                                                      i, \
-                                                                     self.readLowByte(), \
-                                                                     self.readLowBytesAsWord(), \
-                                                                     self.readLowBytesAsWord(), \
-                                                                     self.readLowBytesAsWord(), \
-                                                                     self.readLowBytesAsWord() ) )
+                                                                     type, \
+                                                                     padWord, \
+                                                                     destAddress, \
+                                                                     lengthChunks, \
+                                                                     pokeAddress ) )
             self._blocks[i].printStatus( 1, not self.isShortLogging )
             self._blocks[i].validate()
         
@@ -1736,24 +2107,33 @@ class KCRODataRecordReader(KCAbstractRecordReader):
                 if isHighRange == False:
                     self._printer.printStatus( 1, "WARNING: Low range destination address seen.  Assuming that only low-byte of each decle written.  Assumption could be wrong." )
                 baseAddress = block.makeAddressHighRange( block.destAddress )
-                for i in range( 0, lengthBytes // 2 ):
-                    highByte = self.readRawByte() & 0xff
-                    lowByte  = self.readRawByte() & 0xff
+                # Copy all of the block's decles that are in the record at once
+                if isHighRange:
+                    copiedCount = self.readRawWordsIntoMemoryMap( baseAddress, lengthBytes // 2, 'header block %d' % blockIndex )
+                else:
                     # If low address range, only the low byte value of decle is written
-                    highByte = highByte if isHighRange else 0x00
-                    self.memoryMap.writeWord( baseAddress+i, ( highByte << 8 ) | lowByte )
+                    copiedCount = min( lengthBytes, len( self._binData ) - self._binIndex ) // 2
+                    if copiedCount > 0:
+                        blockData = bytearray( self._binData[self._binIndex:self._binIndex + 2 * copiedCount] )
+                        blockData[0::2] = bytes( copiedCount )
+                        self.memoryMap.writeByteBuffer( baseAddress, blockData, 0, 2 * copiedCount, 'header block %d' % blockIndex )
+                        self._binIndex += 2 * copiedCount
+                # Any decles left over are past the end of a truncated record.  If low address range, the mask
+                # clears the high byte, so only the low byte value of decle is written.
+                decleMask = 0xffff if isHighRange else 0x00ff
+                for i in range( copiedCount, lengthBytes // 2 ):
+                    self.memoryMap.writeWord( baseAddress+i, self.readRawWord() & decleMask )
             if block.pokeAddress != block.ADDR_NONE:
-                self._printer.printStatus( 1, "Handling poke addresses not yet implemented (address = $%04x).  Ignoring." % block.pokeAddress )
+                self._printer.printStatus( 1, "Handling poke addresses not yet implemented (address = $%04x).  Ignoring.", block.pokeAddress )
         elif block.type == block.TYPE_SKIP_DATA:
             if block.lengthChunks != 0:
                 # Print block of data to screen but then read it to throw it away
                 if not self.isShortLogging:
                     self._printer.printStatus( 1, "Skipping the following data:" )
                     self.printNextData(2, lengthBytes)
-                for i in range( 0, lengthBytes ):
-                    self.readRawByte()
+                self.skipRawBytes( lengthBytes )
             if block.pokeAddress != block.ADDR_NONE:
-                self._printer.printStatus( 1, "Handling poke addresses not yet implemented (address = $%04x).  Ignoring." % block.pokeAddress )
+                self._printer.printStatus( 1, "Handling poke addresses not yet implemented (address = $%04x).  Ignoring.", block.pokeAddress )
         else:
             self._printer.errorExit( 4, 'Header block type of $%02x is not recognized.' % self.type )
 
@@ -1773,6 +2153,9 @@ class KCRODataRecordReader(KCAbstractRecordReader):
         HIGH_ADDR_MIN      = KCAbstractRecordReader.KC_TO_MC_OFFSET # while high range means "copy entire decle".  This only is a loose guess.
         HIGH_ADDR_MAX      = KCAbstractRecordReader.ADDRESS_END
 
+        # Three blocks are made per record, so the fixed attributes are slotted rather than kept in a per-instance dict
+        __slots__          = ( '_printer', 'index', 'type', 'padWord', 'destAddress', 'lengthChunks', 'pokeAddress' )
+
         def __init__( self, statusPrinter, index, type, padWord, destAddress, lengthChunks, pokeAddress ):
             """
             Initializer
@@ -1797,6 +2180,8 @@ class KCRODataRecordReader(KCAbstractRecordReader):
                 indentLevel     - Integer for the printing indentation level
                 isLongFormat    - Boolean for whether long format (or short format) should be used.
             """
+            if not self._printer.doPrintStatus:
+                return
             if isLongFormat:
                 self._printer.printStatus( indentLevel,   'Header block %d:' % self.index )
                 self._printer.printStatus( indentLevel+1, 'Type             : $%02x' % self.type )
@@ -1828,25 +2213,19 @@ class KCRODataRecordReader(KCAbstractRecordReader):
                 self._printer.errorExit( 4, 'Length in chunks ($%04x) exceeds max of $%04x.' % (self.lengthChunks, self.MAX_CHUNKS ) )
                 
             if self.type == self.TYPE_BULK_COPY:
-                if self.destAddress != self.ADDR_NONE and \
-                   self.isAddressLowRange( self.destAddress ) == False and \
-                   self.isAddressHighRange( self.destAddress ) == False:
+                if not self.isAddressNoneOrInRange( self.destAddress ):
                     self._printer.errorExit( 4, 'Destination address was an out-of-range value of $%04x.' % self.destAddress )
                 if self.destAddress != self.ADDR_NONE and self.lengthChunks == 0 or \
                    self.destAddress == self.ADDR_NONE and self.lengthChunks != 0:
                     self._printer.errorExit( 4, 'One of destination address ($%04x) or length in chunks ($04x) was zero when the other was not.' % (self.destAddress, self.lengthChunks) )
-                if self.pokeAddress != self.ADDR_NONE and \
-                   self.isAddressLowRange( self.pokeAddress ) == False and \
-                   self.isAddressHighRange( self.pokeAddress ) == False:
+                if not self.isAddressNoneOrInRange( self.pokeAddress ):
                     self._printer.errorExit( 4, 'Poke address was an out-of-range value of $%04x.' % self.pokeAddress )
             elif self.type == self.TYPE_SKIP_DATA:
                 if self.destAddress != self.ADDR_NONE:
                     self._printer.errorExit( 4, 'Destination address was a non-zero value of $%04x in a "skip data" record block.' % self.destAddress )
                 if self.lengthChunks == 0:
                     self._printer.errorExit( 4, 'Length in chunks was 0 in "skip data" record block.' )
-                if self.pokeAddress != self.ADDR_NONE and \
-                   self.isAddressLowRange( self.pokeAddress ) == False and \
-                   self.isAddressHighRange( self.pokeAddress ) == False:
+                if not self.isAddressNoneOrInRange( self.pokeAddress ):
                     self._printer.errorExit( 4, 'Poke address was an out-of-range value of $%04x in a "skip data" record block.' % self.pokeAddress )
             else:
                 self._printer.errorExit( 4, 'Header block type of $%02x is not recognized.' % self.type )
@@ -1855,13 +2234,21 @@ class KCRODataRecordReader(KCAbstractRecordReader):
             """
             Returns boolean for whether the address is in the legal low address range.
             """
-            return True if ( address >= self.LOW_ADDR_MIN and address <= self.LOW_ADDR_MAX) else False
+            return self.LOW_ADDR_MIN <= address <= self.LOW_ADDR_MAX
         
+        def isAddressNoneOrInRange(self, address):
+            """
+            Returns boolean for whether the address is ADDR_NONE or in either of the legal address ranges.
+            """
+            return address == self.ADDR_NONE or \
+                   self.LOW_ADDR_MIN <= address <= self.LOW_ADDR_MAX or \
+                   self.HIGH_ADDR_MIN <= address <= self.HIGH_ADDR_MAX
+
         def isAddressHighRange(self, address):
             """
             Returns boolean for whether the address is in the legal high address range.
             """
-            return True if ( address >= self.HIGH_ADDR_MIN and address <= self.HIGH_ADDR_MAX) else False
+            return self.HIGH_ADDR_MIN <= address <= self.HIGH_ADDR_MAX
             
         def makeAddressHighRange( self, address ):
             return address if address >= self.HIGH_ADDR_MIN else address
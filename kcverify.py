@@ -8,12 +8,31 @@ Created on Sat Nov 12 15:37:01 2016
 # Tape image verify script
 
 import argparse
+from array import array
+import mmap
+import re
 import sys
 
 class PerLine:
+    SYNC_PATTERN = "00000000000000000000000001111110000000000000000000000000101111010000000000000000000000001101101100000000000000000000000011100111"
+    # Byte translation table that reads anything that is not a '1' as a '0'
+    NOT_ONE = bytes.maketrans(bytes(range(256)), b'0'*0x31 + b'1' + b'0'*(256-0x32))
+    LEADING_ZEROS = re.compile('0*')
+    SYNC_LEADING_ZEROS = SYNC_PATTERN.index('1')
+    ROW_LEN = 37
+    ROW_MARKER = '11101'
+    MAX_DECODED_CHUNKS = 4096
+    # Codes are 15 bits, so the top bit of an ECC table entry marks it as usable
+    ECC_VALID = 0x8000
+    # The attributes are fixed, so they are kept in slots rather than a per-instance dict
+    __slots__ = ('args', 'ecc', 'decoded_chunks')
+
     def __init__(self, args):
         self.args = args
         self.CreateECCTable()
+        # Leaders and repeated records produce the same chunks over and over, so decoded
+        # chunks are cached by their bits, along with the bits fixed while decoding them
+        self.decoded_chunks = {}
 
     def CreateECCTable(self):
         low_syndrome = [0x00,0x0d,0x1a,0x17,0x15,0x18,0x0f,0x02,
@@ -38,106 +57,96 @@ class PerLine:
                 0x02,0x01,0x01,0x02,0x01,0x02,0x02,0x02]
         """
                 
-        # map from bad code, to tuple (status, fixed_code)
-        self.ecc = {}
+        # map from code to ECC_VALID|fixed_code, or 0 if the code can't be fixed.  Every 15-bit code
+        # has an entry, so the table is an array indexed by the code
+        self.ecc = array('H', bytes(2*32768))
+        correct_codes = [i | (high_syndrome[i>>5] ^ low_syndrome[i&0x1f]) << 10 for i in range(0,1024)]
         # first, add correct codes
-        for i in range(0,1024):
-            code = i | (high_syndrome[(i>>5)&0x1f] ^ low_syndrome[i&0x1f]) << 10
-            self.ecc[code] = (1,code)
+        for code in correct_codes:
+            self.ecc[code] = self.ECC_VALID | code
         # now add single-bit errors
-        correct_keys = list(self.ecc.keys())
-        for k in correct_keys:
+        for code in correct_codes:
+            fixed = self.ECC_VALID | code
             for bad_bit in range(0,15):
-                bad_code = k ^ (1<<bad_bit)
-                self.ecc[bad_code] = (2,k)
-        for i in range(0,32768):
-            if self.ecc.get(i) == None:
-                self.ecc[i] = (0,0)
+                self.ecc[code ^ (1<<bad_bit)] = fixed
                 
-    def DecodeChunk(self, row_array):
-        column_array = [0] * 32
-        i = 0        
-        for row in row_array:
-            for j in range(0,32):
-                column_array[j] = column_array[j]*2 + ((row >> (31-j))&1)
-            i = i + 1
+    def DecodeChunk(self, row_array, fixes):
+        "Returns the chunk's 32 corrected codes, and adds a (bad code, fixed code) pair to fixes for each fixed bit"
+        # Transpose the 15x32 bit matrix by zipping the rows as binary strings
+        rows = [format(row,'032b') for row in row_array]
+        column_array = [int(''.join(column),2) for column in zip(*rows)]
+        ecc = self.ecc
         for i in range(0,32):
             #print(column_array[i])
-            t = self.ecc[column_array[i]]
-            #print(column_array[i],t)
-            if t[0] == 2:
-                print("Fixed Bit",column_array[i],'->',t[1])
-                column_array[i] = t[1]
-            if t[0] == 0:
+            fixed = ecc[column_array[i]]
+            #print(column_array[i],fixed)
+            if fixed == 0:
                 print("Unrecoverable Error!!")
                 sys.exit()
+            if fixed != self.ECC_VALID | column_array[i]:
+                print("Fixed Bit",column_array[i],'->',fixed & 0x7fff)
+                fixes.append((column_array[i], fixed & 0x7fff))
+                column_array[i] = fixed & 0x7fff
         return column_array
         
     def Process(self,line):
         #print(len(line))
-        c_count = 0
-        state = 0
-        zero_count = 0
-        counting_zeros = True
-        sync_pattern = ''
-        char_count = 0
-        row_count = 0
+        # Leading zeros are counted up to the first non-zero character, without copying the line
+        zero_count = self.LEADING_ZEROS.match(line).end()
+        self.args.outfile.write('0'*zero_count)
         chunk_count = 0
-        for c in line:
-            if state == 0:
-                if c == '0':
-                    if counting_zeros:
-                        zero_count = zero_count + 1
-                        self.args.outfile.write('0')
+        # The sync pattern's first '1' can't come before the line's first '1', so the search skips the leader
+        sync_index = line.find(self.SYNC_PATTERN, max(0, zero_count - self.SYNC_LEADING_ZEROS))
+        if sync_index >= 0:
+            print("Zero Count =",zero_count-25)
+            self.args.outfile.write(self.SYNC_PATTERN[25:])
+            row_start = sync_index + len(self.SYNC_PATTERN)
+            # Anything that is not a '1' (including error markers) is read as a 0 bit.  The bits are
+            # handled as bytes, one per character, which translate at C speed.
+            bits = line[row_start:].encode('ascii', 'replace').translate(self.NOT_ONE)
+            row_count = len(bits) // self.ROW_LEN
+            # Every row starts with the ROW_MARKER bits.  Check the markers of all the rows at once, one marker
+            # bit at a time, and only decode the rows before the first one without it.
+            good_rows = row_count
+            for k, marker_bit in enumerate(self.ROW_MARKER):
+                bad_row = bits[k:row_count*self.ROW_LEN:self.ROW_LEN].find(b'0' if marker_bit == '1' else b'1')
+                if bad_row >= 0:
+                    good_rows = min(good_rows, bad_row)
+            # The loop's attributes and methods are looked up once
+            row_len = self.ROW_LEN
+            chunk_len = 15*row_len
+            row_marker = self.ROW_MARKER
+            marker_len = len(row_marker)
+            decoded_chunks = self.decoded_chunks
+            write = self.args.outfile.write
+            for chunk_start in range(0, (good_rows - 14)*row_len, chunk_len):
+                chunk_bits = bits[chunk_start:chunk_start + chunk_len]
+                decoded = decoded_chunks.get(chunk_bits)
+                if decoded == None:
+                    # The 32 bits after the marker are the row's data
+                    row_array = [int(chunk_bits[pos+marker_len:pos+row_len], 2)
+                                 for pos in range(0, chunk_len, row_len)]
+                    fixes = []
+                    column_array = self.DecodeChunk(row_array, fixes)
+                    # Transpose the 15-bit codes back into 15 rows of 32 bits by zipping them as binary strings
+                    columns = [format(column,'015b') for column in column_array]
+                    decoded = (fixes, ''.join(row_marker + ''.join(row) for row in zip(*columns)))
+                    if len(decoded_chunks) >= self.MAX_DECODED_CHUNKS:
+                        decoded_chunks.clear()
+                    decoded_chunks[chunk_bits] = decoded
                 else:
-                    counting_zeros = False
-                sync_pattern = sync_pattern + c
-                if len(sync_pattern) > 32*4:
-                    sync_pattern = sync_pattern[1:]
-                if sync_pattern == "00000000000000000000000001111110000000000000000000000000101111010000000000000000000000001101101100000000000000000000000011100111":
-                    print("Zero Count =",zero_count-25)
-                    self.args.outfile.write(sync_pattern[25:])
-                    state = 1
-                    row = 0
-                    char_count = 0
-                    row_count = 0
-                    chunk_count = 0
-                    row_array = []
-            elif state == 1:
-                row = row * 2
-                if c == '1':
-                    row = row + 1
-                char_count = char_count + 1
-                if char_count == 37:
-                    if (row & 0x1f00000000) == 0x1d00000000:
-                        row_array.append(row & 0xffffffff)
-                        row = 0
-                        char_count = 0
-                        row_count = row_count + 1
-                    #elif ((row << 1) & 0x1f00000000) == 0x1d00000000:
-                    #    print("Error! near column",c_count,"trying to eat a bit")
-                    #    row = row & 0xfffffffff
-                    #    char_count = char_count - 1
-                    else:
-                        print("Error! near column",c_count)
-                        sys.exit()
-                if row_count == 15:
-                    column_array = self.DecodeChunk(row_array)
-                    for i in range(0,15):
-                        self.args.outfile.write('11101')
-                        for j in range(0,32):
-                            if (column_array[j] >> (14-i)) & 0x01:
-                                self.args.outfile.write('1')
-                            else:
-                                self.args.outfile.write('0')
-                    row_array = []
-                    chunk_count = chunk_count + 1
-                    #print(ca[0]&0x3ff,end=' ')
-                    row_count = 0
-            #print('c_count:',c_count)
-            c_count = c_count + 1
+                    # Repeat what DecodeChunk() printed when the chunk was first decoded
+                    for bad_code, fixed_code in decoded[0]:
+                        print("Fixed Bit",bad_code,'->',fixed_code)
+                # The chunk's rows are written at once, so anything DecodeChunk() prints still comes before them
+                write(decoded[1])
+                chunk_count = chunk_count + 1
+                #print(ca[0]&0x3ff,end=' ')
+            if good_rows < row_count:
+                print("Error! near column",row_start+(good_rows+1)*self.ROW_LEN-1)
+                sys.exit()
         self.args.outfile.write('\n')
-        #print('chunk_count=',chunk_count,'  row_count=',row_count,'  char_count=',char_count)
+        #print('chunk_count=',chunk_count,'  row_count=',row_count)
                     
                 
                     
@@ -157,6 +166,28 @@ class KCFile:
         self.nframes = None
         self.persample = None
         
+    def ReadLines(self):
+        "Yields the lines of the input file, memory mapped when the file allows it"
+        try:
+            rawdata = mmap.mmap(self.args.infile.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            # Pipes and empty files can't be mapped
+            rawdata = None
+        if rawdata == None or rawdata.find(b'\r') >= 0:
+            # Lines ending in '\r' are left to the text file's newline translation
+            yield from self.args.infile
+            return
+        if hasattr(mmap, 'MADV_SEQUENTIAL'):
+            rawdata.madvise(mmap.MADV_SEQUENTIAL)
+        encoding = self.args.infile.encoding
+        start = 0
+        while start < len(rawdata):
+            end = rawdata.find(b'\n', start) + 1
+            if end == 0:
+                end = len(rawdata)
+            yield rawdata[start:end].decode(encoding)
+            start = end
+
     def Process(self):
         self.perline = PerLine(self.args)
         self.args.outfile.write('cmds')
@@ -166,7 +197,7 @@ class KCFile:
         self.args.outfile.write('args '+str(self.args)+'\n')
         count = 1    
         started = False
-        for line in self.args.infile:
+        for line in self.ReadLines():
             if line[0:len('cmds')] == 'cmds':
                 self.args.outfile.write(line)
             elif line[0:len('args')] == 'args':
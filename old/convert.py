@@ -25,82 +25,79 @@ This program does several things:
 
 """
 
-def StringToNum(str):
-    N = ord(str[0])+ord(str[1])*256
-    if N > 32767:
-        N = N - 65536
-    return N
-
-def NumToString(N):
-    if N < 0:
-        N = N + 65536
-    H = N/256
-    L = N%256
-    return chr(L) + chr(H)
-
-def Normalize(str):
-    N = StringToNum(str)
-    N = (N - 2048)*16
-    return NumToString(N)
-
-fp_in = file("test.dat","rb")
-
-fp_out1 = file("test1.pcm","wb")
-fp_out2 = file("test2.pcm","wb")
-fp_out3 = file("test3.pcm","wb")
-fp_out4 = file("test4.pcm","wb")
-
-s = fp_in.read(20)
-last2 = 0
-last3 = 0
-while len(s) == 20:
+import struct
 
-    # Channel 1
-    fp_out1.write(Normalize(s[0:2]))
+# Frames of 10 samples (20 bytes) are converted a block at a time
+FRAMES_PER_BLOCK = 65536
 
-    # Channel 2
-    #  First sample is interpolated
-    orig_value2 = StringToNum(Normalize(s[2:4]))
-    new_value2 = (5*orig_value2 + last2)/6
-    fp_out2.write(NumToString(new_value2))
+# Precompiled structs for runs of samples (Intel format), by sample count.  Every full block uses the same ones.
+sample_structs = {}
 
-    #  Second sample is exact
-    fp_out2.write(Normalize(s[6:8]))
-    last2 = StringToNum(Normalize(s[6:8]))
+def SamplesStruct(count):
+    "Returns the struct for count samples"
+    samples_struct = sample_structs.get(count)
+    if samples_struct == None:
+        samples_struct = sample_structs[count] = struct.Struct('<%dh' % count)
+    return samples_struct
 
-    #  Third sample is interpolated
-    orig_value2 = StringToNum(Normalize(s[12:14]))
-    new_value2 = (5*orig_value2 + last2)/6
-    fp_out2.write(NumToString(new_value2))
+def Normalize(samples):
+    "Returns a list of the 12 bit unsigned samples scaled to 16 bit signed"
+    return [(N - 2048)*16 for N in samples]
 
-    #  Fourth sample is exact
-    fp_out2.write(Normalize(s[16:18]))
-    last2 = StringToNum(Normalize(s[16:18]))
+def Interpolate(samples, lasts):
+    "Returns a list of the samples moved 1/6 of the way towards the previous exact samples"
+    return [(5*N + last)//6 for N, last in zip(samples, lasts)]
 
-    # Channel 3
+def WriteSamples(fp_out, samples):
+    "Writes a list of samples (Intel format)"
+    fp_out.write(SamplesStruct(len(samples)).pack(*samples))
 
-    #  First sample is interpolated
-    orig_value3 = StringToNum(Normalize(s[4:6]))
-    new_value3 = (5*orig_value3 + last3)/6
-    fp_out3.write(NumToString(new_value3))
+fp_in = open("test.dat","rb")
 
-    #  Second sample is exact
-    fp_out3.write(Normalize(s[8:10]))
-    last3 = StringToNum(Normalize(s[8:10]))
+fp_out1 = open("test1.pcm","wb")
+fp_out2 = open("test2.pcm","wb")
+fp_out3 = open("test3.pcm","wb")
+fp_out4 = open("test4.pcm","wb")
 
-    #  Third sample is interpolated
-    orig_value3 = StringToNum(Normalize(s[14:16]))
-    new_value3 = (5*orig_value3 + last3)/6
-    fp_out3.write(NumToString(new_value3))
+last2 = 0
+last3 = 0
+while True:
+    block = fp_in.read(20*FRAMES_PER_BLOCK)
+    # A partial frame at the end is dropped
+    frames = len(block)//20
+    if frames == 0:
+        break
+    s = Normalize(SamplesStruct(10*frames).unpack_from(block))
 
-    #  Fourth sample is exact
-    fp_out3.write(Normalize(s[18:20]))
-    last3 = StringToNum(Normalize(s[18:20]))
+    # Channel 1
+    WriteSamples(fp_out1, s[0::10])
 
-    # Channel 4
-    fp_out4.write(Normalize(s[10:12]))
+    # Channel 2
+    #  First and third samples are interpolated, second and fourth are exact
+    exact2a = s[3::10]
+    exact2b = s[8::10]
+    channel2 = [0] * (4*frames)
+    channel2[0::4] = Interpolate(s[1::10], [last2] + exact2b[:-1])
+    channel2[1::4] = exact2a
+    channel2[2::4] = Interpolate(s[6::10], exact2a)
+    channel2[3::4] = exact2b
+    WriteSamples(fp_out2, channel2)
+    last2 = exact2b[-1]
 
-    s = fp_in.read(20)
+    # Channel 3
+    #  First and third samples are interpolated, second and fourth are exact
+    exact3a = s[4::10]
+    exact3b = s[9::10]
+    channel3 = [0] * (4*frames)
+    channel3[0::4] = Interpolate(s[2::10], [last3] + exact3b[:-1])
+    channel3[1::4] = exact3a
+    channel3[2::4] = Interpolate(s[7::10], exact3a)
+    channel3[3::4] = exact3b
+    WriteSamples(fp_out3, channel3)
+    last3 = exact3b[-1]
+
+    # Channel 4
+    WriteSamples(fp_out4, s[5::10])
 
 fp_in.close()
 fp_out1.close()